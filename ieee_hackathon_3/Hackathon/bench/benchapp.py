@@ -0,0 +1,41 @@
+"""Shared setup for the benchmarks that drive the app in-process.
+
+Config reads the environment when docconnect is first imported, so a
+benchmark calls bench_app() before importing anything from docconnect:
+
+    from benchapp import bench_app
+    app = bench_app('stress_booking')
+    from docconnect.booking import reserve_slot  # noqa: E402
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bench_app(name, db_path=None, **env):
+    """Build the app on a throwaway SQLite file, with the schema created
+    and the default clinics and schedule seeded.
+
+    db_path reuses a given database file instead. Sessions and the
+    directory cache stay in memory unless the environment says otherwise,
+    and env sets further variables, e.g. SQL_COUNT_HEADER='1'.
+    """
+    path = db_path or os.path.join(tempfile.mkdtemp(prefix=f'{name}_'), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(path)
+    os.environ.setdefault('SESSION_BACKEND', 'memory')
+    os.environ.setdefault('DIRECTORY_CACHE_BACKEND', 'memory')
+    os.environ.update(env)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+    from docconnect import create_app
+    from docconnect.migrations import upgrade_database
+    from docconnect.seeds import seed
+
+    app = create_app()
+    with app.app_context():
+        upgrade_database()
+        seed()
+    return app
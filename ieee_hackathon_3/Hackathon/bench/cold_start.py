@@ -0,0 +1,72 @@
+"""Measure how long a fresh interpreter takes to import and build the app.
+
+Each run is a new process, as a server worker or CLI invocation would be:
+
+    python bench/cold_start.py --runs 10 --max-ratio 1.5
+
+The same number of processes that only import flask and flask_sqlalchemy
+give a baseline for the machine. Exits non-zero when the create_app
+median exceeds --max-ratio times the baseline median, since the absolute
+time mostly measures how fast the machine imports those libraries.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import time
+started = time.perf_counter()
+from docconnect import create_app
+create_app()
+print(time.perf_counter() - started)
+print(int('bcrypt' in __import__('sys').modules))
+'''
+
+BASELINE_PROBE = '''
+import time
+started = time.perf_counter()
+import flask, flask_sqlalchemy
+print(time.perf_counter() - started)
+'''
+
+
+def run(probe, env):
+    """Run probe in a fresh interpreter and return its output lines."""
+    return subprocess.run([sys.executable, '-c', probe], cwd=HERE, env=env,
+                          capture_output=True, text=True, check=True).stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ratio', type=float, default=1.5,
+                        help='Largest allowed create_app median as a multiple of the baseline median.')
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='cold_start_'), 'app.db'),
+               SESSION_BACKEND='memory', DIRECTORY_CACHE_BACKEND='memory')
+    timings, baselines = [], []
+    # Alternate the two probes so a change in machine load hits both
+    for _ in range(args.runs):
+        baselines.append(float(run(BASELINE_PROBE, env)[0]) * 1000)
+        output = run(PROBE, env)
+        timings.append(float(output[0]) * 1000)
+        bcrypt_loaded = output[1] == '1'
+
+    baseline = statistics.median(baselines)
+    median = statistics.median(timings)
+    ratio = median / baseline
+    print(f'create_app: median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms '
+          f'over {args.runs} runs; bcrypt imported: {bcrypt_loaded}')
+    print(f'baseline (import flask, flask_sqlalchemy): median {baseline:.1f} ms; '
+          f'create_app adds {median - baseline:.1f} ms, {ratio:.2f}x the baseline')
+    sys.exit(1 if ratio > args.max_ratio else 0)
+
+
+if __name__ == '__main__':
+    main()
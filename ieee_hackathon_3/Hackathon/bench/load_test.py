@@ -0,0 +1,243 @@
+"""Drive login -> select_clinic -> dashboard -> book flows and report per-route latency.
+
+Seeds a throwaway SQLite database with clinics, doctors, patients and
+historical bookings, then runs flows through the Flask test client from
+--concurrency threads:
+
+    python bench/load_test.py --doctors 200 --bookings 50000 --flows 500 --output before.json
+
+To load a real multi-worker server instead, seed a database and point the
+server at it, with SQL_COUNT_HEADER=1 so SQL counts are still reported:
+
+    python bench/load_test.py --seed-only --db /tmp/load.db
+    DATABASE_URL=sqlite:////tmp/load.db SQL_COUNT_HEADER=1 SESSION_BACKEND=sqlite RATE_LIMIT_BACKEND=off \\
+        gunicorn -w 4 -b 127.0.0.1:8000 'docconnect:create_app()'
+    python bench/load_test.py --server http://127.0.0.1:8000 --db /tmp/load.db --flows 2000
+
+A flow stops at the first step that does not land where it should, such
+as a login refused with a 503, and the book step also counts the
+bookings that were actually made. Results are printed and, with
+--output, saved as JSON for comparing commits.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from benchapp import ROOT, bench_app
+
+PASSWORD = 'load-test'
+HOURS = ['10', '11', '12', '14', '15', '16', '17', '18', '19', '20', '21', '22']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clinics', type=int, default=4)
+    parser.add_argument('--doctors', type=int, default=100)
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--bookings', type=int, default=20000, help='Historical appointments to seed.')
+    parser.add_argument('--days', type=int, default=60, help='Days the bookings are spread over.')
+    parser.add_argument('--flows', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    parser.add_argument('--db', help='SQLite file to seed or reuse (default: a temporary file).')
+    parser.add_argument('--seed-only', action='store_true')
+    parser.add_argument('--server', help='Base URL of a running server to load instead of the test client.')
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed.')
+    return parser.parse_args()
+
+
+args = parse_args()
+random.seed(args.seed)
+os.environ.setdefault('RATE_LIMIT_BACKEND', 'off')
+app = bench_app('load_test', db_path=args.db, SQL_COUNT_HEADER='1', BCRYPT_ROUNDS=str(args.bcrypt_rounds))
+DB_PATH = app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]
+
+from sqlalchemy import insert  # noqa: E402
+from docconnect.hashing import hasher  # noqa: E402
+from docconnect.availability import rebuild_availability  # noqa: E402
+from docconnect.booking import BookingResult  # noqa: E402
+from docconnect.models import db, Account, Appointment, Clinic, Doctor, SpecialityEnum, User  # noqa: E402
+from docconnect.schedules import default_schedule  # noqa: E402
+
+
+def dates(days):
+    return [f'2030-{month:02d}-{day:02d}' for month in range(1, 13) for day in range(1, 29)][:days]
+
+
+def seed():
+    with app.app_context():
+        if Account.query.count():
+            return
+        hashed = hasher.hash_password(PASSWORD.encode('utf-8'))
+        clinics = Clinic.query.all()
+        clinics += [Clinic(name=f'Load Clinic {n}', location='Pune') for n in range(len(clinics), args.clinics)]
+        schedule = default_schedule()
+        doctors = [Doctor(email=f'doc{n}@load.test', password=hashed, clinic=clinics[n % len(clinics)],
+                          speciality=list(SpecialityEnum)[n % len(SpecialityEnum)],
+                          schedule=schedule, booked_time=[])
+                   for n in range(args.doctors)]
+        patients = [User(email=f'patient{n}@load.test', password=hashed) for n in range(args.patients)]
+        db.session.add_all(clinics + doctors + patients)
+        db.session.flush()
+        db.session.add_all(Account(email=doctor.email, role='doctor', password=hashed, doctor=doctor)
+                           for doctor in doctors)
+        db.session.add_all(Account(email=patient.email, role='patient', password=hashed, user=patient)
+                           for patient in patients)
+
+        slots = {(random.randrange(len(doctors)), date, hour)
+                 for date, hour in ((random.choice(dates(args.days)), random.choice(HOURS))
+                                    for _ in range(args.bookings))}
+        if slots:
+            db.session.execute(insert(Appointment.__table__), [
+                {'doctor_id': doctors[n].id, 'date': date, 'time': hour,
+                 'patient_id': patients[i % len(patients)].id, 'patient_email': patients[i % len(patients)].email}
+                for i, (n, date, hour) in enumerate(slots)])
+        db.session.commit()
+        rebuild_availability()
+
+
+class TestClientDriver:
+    def __init__(self):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.headers, response.data
+
+
+class HttpDriver:
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()),
+                                                  self._NoRedirect)
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(urllib.request.Request(self.base_url + path, data=body, method=method)) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers, error.read()
+
+
+def run_flow(driver, number, record):
+    patient = f'patient{number % args.patients}@load.test'
+    clinic_id = random.randrange(args.clinics) + 1
+    doctor_id = random.randrange(args.doctors) + 1
+    date = random.choice(dates(args.days))
+    dashboard = f'/dashboard?clinic_id={clinic_id}'
+    # Each step either renders its page or redirects to the path given
+    steps = [
+        ('login', 'POST', '/login', {'username': patient, 'password': PASSWORD}, '/select_clinic'),
+        ('select_clinic', 'GET', '/select_clinic', None, None),
+        ('dashboard', 'GET', dashboard, None, None),
+        ('doctor_slots', 'GET', f'{dashboard}&doc_id={doctor_id}&selected_date={date}', None, None),
+        ('book', 'POST', dashboard,
+         {'time': random.choice(HOURS), 'selected_doc_id': doctor_id, 'selected_date': date}, '/dashboard'),
+        ('logout', 'GET', '/logout', None, '/login'),
+    ]
+    for name, method, path, data, redirect in steps:
+        started = time.perf_counter()
+        status, headers, _ = driver.request(method, path, data)
+        elapsed = time.perf_counter() - started
+        sql = headers.get('X-SQL-Statements')
+        location = urllib.parse.urlsplit(headers.get('Location', ''))
+        ok = status == 302 and location.path == redirect if redirect else status == 200
+        booked = None
+        if name == 'book' and ok:
+            # The redirect is the same whether or not the slot was free;
+            # the flashed message on the page it leads to tells them apart
+            _, _, body = driver.request('GET', location._replace(scheme='', netloc='').geturl())
+            booked = BookingResult.booked.value.encode() in body
+        record(name, elapsed, ok, int(sql) if sql is not None else None, booked)
+        # A refused login would leave the remaining steps bouncing to /login
+        if not ok:
+            return
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def commit_id():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    seed()
+    if args.seed_only:
+        print(f'Seeded {DB_PATH}')
+        return
+
+    samples = defaultdict(lambda: {'latency': [], 'sql': [], 'errors': 0, 'booked': 0})
+    lock = threading.Lock()
+
+    def record(name, elapsed, ok, sql, booked=None):
+        with lock:
+            sample = samples[name]
+            sample['latency'].append(elapsed)
+            if sql is not None:
+                sample['sql'].append(sql)
+            if not ok:
+                sample['errors'] += 1
+            if booked:
+                sample['booked'] += 1
+
+    def worker(numbers):
+        driver = HttpDriver(args.server) if args.server else TestClientDriver()
+        for number in numbers:
+            run_flow(driver, number, record)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, [range(n, args.flows, args.concurrency) for n in range(args.concurrency)]))
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    for name, sample in samples.items():
+        latency = sample['latency']
+        routes[name] = {
+            'requests': len(latency),
+            'errors': sample['errors'],
+            'booked': sample['booked'] if name == 'book' else None,
+            'throughput_rps': round(len(latency) / elapsed, 1),
+            'p50_ms': round(percentile(latency, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latency, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latency, 0.99) * 1000, 2),
+            'sql_mean': round(sum(sample['sql']) / len(sample['sql']), 2) if sample['sql'] else None,
+            'sql_max': max(sample['sql']) if sample['sql'] else None,
+        }
+        print(f"{name:>14}: {routes[name]['requests']:6d} req {routes[name]['errors']:4d} err "
+              f"p50 {routes[name]['p50_ms']:8.2f} ms  p95 {routes[name]['p95_ms']:8.2f} ms  "
+              f"p99 {routes[name]['p99_ms']:8.2f} ms  sql {routes[name]['sql_mean']}"
+              + (f"  booked {routes[name]['booked']}" if name == 'book' else ''))
+    print(f'{args.flows} flows in {elapsed:.2f}s ({args.flows / elapsed:.1f} flows/s)')
+
+    if args.output:
+        settings = {key: value for key, value in vars(args).items() if key not in ('output', 'seed_only')}
+        with open(args.output, 'w') as f:
+            json.dump({'commit': commit_id(), 'settings': settings, 'elapsed_s': round(elapsed, 3),
+                       'flows_per_second': round(args.flows / elapsed, 2), 'routes': routes}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Time a patient's "my appointments" page query as the doctor count grows.
+
+Each round adds doctors with a day of bookings each for other patients,
+then times the measured patient's upcoming and past pages. The measured
+patient's own bookings are made once, in the first round, so the pages
+return the same rows every round and only the table grows:
+
+    python bench/patient_appointments.py --rounds 3 --doctors 2000 --max-growth 2
+
+Exits non-zero when the query plan stops using the patient index, or when
+a page's median in a later round exceeds --max-growth times its first
+round median; the doctor count meanwhile grows --rounds times. Absolute
+timings are printed but depend on the machine, so they are not checked.
+Runs against a throwaway SQLite file, never the real doc_app.db.
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from benchapp import bench_app
+
+app = bench_app('patient_appointments')
+
+from sqlalchemy import insert  # noqa: E402
+from docconnect.booking import patient_appointments_page, patient_appointments_query  # noqa: E402
+from docconnect.queryplans import explain, full_scans, uses_index  # noqa: E402
+from docconnect.models import db, Appointment, Clinic, Doctor, User, SpecialityEnum  # noqa: E402
+
+HOURS = [f'{hour:02d}' for hour in range(10, 18)]
+
+
+def add_doctors(count, patients, measured=None, measured_bookings=0):
+    """Add count doctors, each fully booked for one day spread around today
+    by the given patients. With measured, measured_bookings of the new
+    doctors also get one 09:00 booking by that patient, on days spread
+    evenly before and after today."""
+    clinics = Clinic.query.all()
+    start = Doctor.query.count()
+    doctors = [Doctor(email=f'doc{n}@bench.test', password=b'x', clinic=clinics[n % len(clinics)],
+                      speciality=list(SpecialityEnum)[n % len(SpecialityEnum)], booked_time=[])
+               for n in range(start, start + count)]
+    db.session.add_all(doctors)
+    db.session.flush()
+    today = date.today()
+    rows = []
+    for n, doctor in enumerate(doctors, start):
+        day = (today + timedelta(days=n % 120 - 60)).isoformat()
+        for i, hour in enumerate(HOURS):
+            patient = patients[(n * len(HOURS) + i) % len(patients)]
+            rows.append(dict(doctor_id=doctor.id, patient_id=patient.id, patient_email=patient.email,
+                             date=day, time=hour))
+    for k in range(measured_bookings if measured else 0):
+        day = (today + timedelta(days=k * 120 // measured_bookings - 60)).isoformat()
+        rows.append(dict(doctor_id=doctors[k * count // measured_bookings].id, patient_id=measured.id,
+                         patient_email=measured.email, date=day, time='09'))
+    db.session.execute(insert(Appointment), rows)
+    db.session.commit()
+
+
+def median_ms(patient_id, upcoming, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        page, _ = patient_appointments_page(patient_id, upcoming)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(page)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--doctors', type=int, default=2000)
+    parser.add_argument('--patients', type=int, default=500)
+    parser.add_argument('--bookings', type=int, default=16, help="The measured patient's bookings.")
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--max-growth', type=float, default=2,
+                        help='Largest allowed ratio of a round median to the first round median.')
+    args = parser.parse_args()
+
+    failed = False
+    with app.app_context():
+        db.session.add_all(User(email=f'patient{n}@bench.test', password=b'x') for n in range(args.patients))
+        db.session.commit()
+        patients = User.query.all()
+        measured, others = patients[0], patients[1:]
+
+        for plan_upcoming in (True, False):
+            plan = explain(patient_appointments_query(measured.id, plan_upcoming))
+            if full_scans(plan) or not uses_index(plan, 'ix_appointment_patient'):
+                print('FAIL query plan:', *plan, sep='\n  ')
+                failed = True
+
+        first = {}
+        for round_number in range(args.rounds):
+            if round_number == 0:
+                add_doctors(args.doctors, others, measured, args.bookings)
+            else:
+                add_doctors(args.doctors, others)
+            doctors = Doctor.query.count()
+            for upcoming in (True, False):
+                median, rows = median_ms(measured.id, upcoming, args.repeat)
+                growth = median / first.setdefault(upcoming, median)
+                ok = growth <= args.max_growth
+                failed |= not ok
+                print(f"{'ok' if ok else 'FAIL':>4} {doctors:>7} doctors "
+                      f"{'upcoming' if upcoming else 'past':>8}: {rows:>3} rows, median {median:.3f} ms, "
+                      f"{growth:.2f}x the first round")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Check the listing pages run a bounded number of SQL statements.
+
+Each page is fetched with a cold and a warm directory cache, first with a
+few doctors and again after many more are added; the statement counts
+must not grow with the row count.
+
+    python bench/query_counts.py --doctors 5 --more 500
+
+Exits non-zero when a page grows or exceeds --max-queries.
+Runs against a throwaway SQLite file, never the real doc_app.db.
+"""
+import argparse
+import sys
+
+from benchapp import bench_app
+
+app = bench_app('query_counts')
+
+from docconnect.cache import directory_cache  # noqa: E402
+from docconnect.instrumentation import record_queries  # noqa: E402
+from docconnect.models import db, Clinic, Doctor, SpecialityEnum  # noqa: E402
+
+PAGES = [
+    '/register',
+    '/select_clinic',
+    '/dashboard',
+    '/dashboard?clinic_id=1',
+    '/dashboard?clinic_id=1&speciality=oncologist',
+    '/dashboard?clinic_id=1&doc_id=1&selected_date=2030-01-07',
+]
+
+
+def add_doctors(count):
+    with app.app_context():
+        clinics = Clinic.query.all()
+        start = Doctor.query.count()
+        db.session.add_all(
+            Doctor(email=f'doc{n}@bench.test', password=b'x', clinic=clinics[n % len(clinics)],
+                   speciality=list(SpecialityEnum)[n % len(SpecialityEnum)], booked_time=[])
+            for n in range(start, start + count))
+        db.session.commit()
+
+
+def measure(client):
+    counts = {}
+    with app.app_context():
+        engine = db.engine
+    for page in PAGES:
+        for cache in ('cold', 'warm'):
+            if cache == 'cold':
+                directory_cache.invalidate()
+            with record_queries(engine) as statements:
+                response = client.get(page)
+            assert response.status_code == 200, (page, response.status_code)
+            counts[page, cache] = len(statements)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--doctors', type=int, default=5)
+    parser.add_argument('--more', type=int, default=500)
+    parser.add_argument('--max-queries', type=int, default=5)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'patient@bench.test', 'password': 'bench', 'role': 'patient'})
+    client.post('/login', data={'username': 'patient@bench.test', 'password': 'bench'})
+
+    add_doctors(args.doctors)
+    before = measure(client)
+    add_doctors(args.more)
+    after = measure(client)
+
+    failed = False
+    for key, count in after.items():
+        page, cache = key
+        ok = count == before[key] and count <= args.max_queries
+        failed |= not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {page:<58} {cache}: "
+              f"{before[key]} queries with {args.doctors} doctors, {count} with {args.doctors + args.more}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Compare the old PickleType encoding of Doctor.booked_time with JSON.
+
+Each size is written to and read back from a one-row SQLite table through
+SQLAlchemy, the same path the Doctor columns take.
+
+    python bench/slot_encoding.py --sizes 10 1000 100000 --repeat 20
+"""
+import argparse
+import time
+
+from sqlalchemy import JSON, Column, Integer, MetaData, PickleType, Table, create_engine, insert, select, update
+
+
+def bookings(count):
+    return [{'date': f'2030-{day // 28 % 12 + 1:02d}-{day % 28 + 1:02d}', 'time': f'{10 + hour:02d}',
+             'patient_email': f'patient{n % 5000}@bench.test'}
+            for n in range(count) for day, hour in [divmod(n, 12)]]
+
+
+def measure(engine, table, value, repeat):
+    with engine.begin() as conn:
+        conn.execute(table.delete())
+        conn.execute(insert(table).values(id=1, booked_time=value))
+        size = conn.exec_driver_sql(f'SELECT length(booked_time) FROM {table.name}').scalar()
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with engine.begin() as conn:
+            conn.execute(update(table).where(table.c.id == 1).values(booked_time=value))
+    save = (time.perf_counter() - started) / repeat
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with engine.connect() as conn:
+            loaded = conn.execute(select(table.c.booked_time).where(table.c.id == 1)).scalar()
+    load = (time.perf_counter() - started) / repeat
+
+    assert loaded == value
+    return size, save, load
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    metadata = MetaData()
+    tables = {
+        'pickle': Table('pickled', metadata, Column('id', Integer, primary_key=True), Column('booked_time', PickleType)),
+        'json': Table('json', metadata, Column('id', Integer, primary_key=True), Column('booked_time', JSON)),
+    }
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+
+    for count in args.sizes:
+        value = bookings(count)
+        for label, table in tables.items():
+            size, save, load = measure(engine, table, value, args.repeat)
+            print(f'{count:>7} bookings {label:>6}: {size / 1024:9.1f} KiB '
+                  f'save {save * 1000:8.2f} ms  load {load * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Compare SQLite read/write throughput with default settings and with the
+WAL / busy-timeout pragmas applied by database.init_database.
+
+    python bench/sqlite_modes.py --seconds 5 --readers 8 --writers 4
+"""
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, select, insert  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from docconnect.config import Config  # noqa: E402
+from docconnect.database import sqlite_pragmas, apply_pragmas  # noqa: E402
+from docconnect.models import db, Clinic, Doctor, Appointment, SpecialityEnum  # noqa: E402
+
+HOURS = ['10', '11', '12', '14', '15', '16', '17', '18', '19', '20', '21', '22']
+
+
+def make_engine(path, tuned, pool_size):
+    engine = create_engine(f'sqlite:///{path}', pool_size=pool_size, max_overflow=0)
+    if tuned:
+        pragmas = sqlite_pragmas(vars(Config))
+        event.listen(engine, 'connect', lambda conn, _: apply_pragmas(conn, pragmas))
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Clinic.__table__).values(id=1, name='Bench', location='Pune'))
+        conn.execute(insert(Doctor.__table__), [
+            {'id': i, 'email': f'doc{i}@bench.test', 'password': b'x', 'clinic_id': 1,
+             'speciality': SpecialityEnum.oncologist.name, 'all_time': None, 'booked_time': None}
+            for i in range(1, 51)
+        ])
+    return engine
+
+
+def run(tuned, seconds, readers, writers):
+    path = os.path.join(tempfile.mkdtemp(prefix='sqlite_modes_'), 'bench.db')
+    engine = make_engine(path, tuned, pool_size=readers + writers)
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    slots = itertools.count()
+    deadline = time.time() + seconds
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def reader(n):
+        while time.time() < deadline:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(select(Appointment.time).where(Appointment.doctor_id == n % 50 + 1,
+                                                                Appointment.date == '2030-01-01')).all()
+                bump('reads')
+            except OperationalError:
+                bump('locked')
+
+    def writer(_):
+        while time.time() < deadline:
+            slot = next(slots)
+            day, hour = divmod(slot, len(HOURS) * 50)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(Appointment.__table__).values(
+                        doctor_id=hour // len(HOURS) + 1, patient_email='p@bench.test',
+                        date=f'2030-{day // 28 % 12 + 1:02d}-{day % 28 + 1:02d}', time=HOURS[hour % len(HOURS)]))
+                bump('writes')
+            except OperationalError:
+                bump('locked')
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return {key: value / seconds for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    args = parser.parse_args()
+
+    for label, tuned in (('default', False), ('tuned', True)):
+        result = run(tuned, args.seconds, args.readers, args.writers)
+        print(f"{label:>8}: {result['reads']:9.0f} reads/s {result['writes']:8.0f} writes/s "
+              f"{result['locked']:6.1f} lock errors/s")
+
+
+if __name__ == '__main__':
+    main()
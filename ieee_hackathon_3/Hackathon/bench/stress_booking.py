@@ -0,0 +1,85 @@
+"""Fire concurrent bookings at one doctor and check each slot has one winner.
+
+    python bench/stress_booking.py --bookings 5000 --threads 32
+
+Runs against a throwaway SQLite file, never the real doc_app.db.
+"""
+import argparse
+import random
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchapp import bench_app
+
+app = bench_app('stress_booking')
+
+from docconnect.booking import reserve_slot, BookingResult  # noqa: E402
+from docconnect.models import db, User, Doctor, Clinic, Appointment, SlotAvailability, SpecialityEnum  # noqa: E402
+
+HOURS = ['10', '11', '12', '14', '15', '16', '17', '18', '19', '20', '21', '22']
+
+
+def seed(patients):
+    with app.app_context():
+        doctor = Doctor(email='stress@doc.test', password=b'x', speciality=SpecialityEnum.oncologist,
+                        clinic=Clinic.query.first(), all_time=HOURS, booked_time=[])
+        db.session.add(doctor)
+        db.session.add_all(User(email=f'p{i}@stress.test', password=b'x') for i in range(patients))
+        db.session.commit()
+        return doctor.id, [u.id for u in User.query.all()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--days', type=int, default=5)
+    args = parser.parse_args()
+
+    doctor_id, patient_ids = seed(patients=50)
+    dates = [f'2030-01-{day:02d}' for day in range(1, args.days + 1)]
+    # Other spellings of the same days must be refused, not booked as new slots
+    spellings = [spelling for day in range(1, args.days + 1)
+                 for spelling in (f'2030-1-{day}', f'2030-01-{day}', f'2030-1-{day:02d}', f'203001{day:02d}')
+                 if spelling not in dates]
+    attempts = [(random.choice(patient_ids), random.choice(dates + spellings), random.choice(HOURS))
+                for _ in range(args.bookings)]
+    start = threading.Barrier(args.threads)
+
+    def book(attempt):
+        patient_id, date, time = attempt
+        with app.app_context():
+            doctor = db.session.get(Doctor, doctor_id)
+            patient = db.session.get(User, patient_id)
+            return (date, time), reserve_slot(doctor, patient, date, time)
+
+    def worker(chunk):
+        start.wait()
+        return [book(attempt) for attempt in chunk]
+
+    chunks = [attempts[i::args.threads] for i in range(args.threads)]
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        outcomes = [outcome for chunk in pool.map(worker, chunks) for outcome in chunk]
+
+    winners = Counter(slot for slot, result in outcomes if result is BookingResult.booked)
+    with app.app_context():
+        stored = Counter((a.date, a.time) for a in Appointment.query.filter_by(doctor_id=doctor_id))
+        masks = {row.date: row.booked_mask for row in SlotAvailability.query.filter_by(doctor_id=doctor_id)}
+
+    expected_masks = defaultdict(int)
+    for date, time in winners:
+        expected_masks[date] |= 1 << HOURS.index(time)
+
+    attempted = {slot for slot, _ in outcomes if slot[0] in dates}
+    assert all(result is BookingResult.invalid_slot for (date, _), result in outcomes if date in spellings), \
+        'a misspelled date was booked'
+    assert all(count == 1 for count in winners.values()), 'a slot was booked twice'
+    assert set(winners) == attempted, 'an attempted slot has no winner'
+    assert stored == winners, 'stored appointments differ from reported winners'
+    assert masks == dict(expected_masks), 'availability bitmaps out of sync'
+    print(f'{len(outcomes)} attempts, {len(winners)} slots, exactly one winner each')
+
+
+if __name__ == '__main__':
+    main()
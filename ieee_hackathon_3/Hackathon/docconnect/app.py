@@ -0,0 +1,45 @@
+from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
+from .config import Config
+from .database import init_database
+from .instrumentation import init_instrumentation
+from .cache import init_directory_cache
+from .ratelimit import init_rate_limits
+from .assets import init_assets
+from .sessions import init_sessions, load_secret_key
+from .hashing import hasher
+from .schedules import slot_label
+from .views import main, event_feed_cache
+from .commands import commands
+import os
+
+
+def create_app(config=None):
+    """Build the app without touching the database.
+
+    The schema is created by `flask init-db` and the default clinics and
+    schedule by `flask seed`, once per deployment rather than on every
+    worker boot. config is a mapping applied over Config.
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(config or {})
+    app.secret_key = app.config['SECRET_KEY'] or load_secret_key(os.path.join(app.instance_path, 'secret_key'))
+    if app.config['TRUSTED_PROXY_HOPS']:
+        # request.remote_addr then names the client, not the proxy
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_HOPS'])
+    init_sessions(app)
+    init_rate_limits(app)
+
+    init_database(app)
+    init_instrumentation(app)
+    init_directory_cache(app)
+    hasher.init_app(app)
+    event_feed_cache.max_entries = app.config['EVENT_FEED_CACHE_SIZE']
+
+    init_assets(app)
+    app.add_template_filter(slot_label)
+    app.register_blueprint(main)
+    app.register_blueprint(commands)
+    return app
+
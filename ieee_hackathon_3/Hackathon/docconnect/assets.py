@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+import shutil
+from flask import current_app, request, send_from_directory, url_for
+
+# `flask build-assets` output is served under /static/build/
+BUILD_DIR = 'build'
+MANIFEST = 'manifest.json'
+# Fingerprinted names change with their content, so they never need revalidating
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html'}
+RESIZABLE = {'.jpg', '.jpeg', '.png'}
+
+
+def fingerprint(name, data):
+    root, ext = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def _write(build, name, data):
+    path = os.path.join(build, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _compress(build, name, data):
+    """Write .gz and, with Brotli installed, .br copies smaller than data;
+    returns the encodings written."""
+    variants = {'gzip': ('.gz', gzip.compress(data, 9, mtime=0))}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants['br'] = ('.br', brotli.compress(data))
+    written = []
+    for encoding, (suffix, compressed) in variants.items():
+        if len(compressed) < len(data):
+            _write(build, name + suffix, compressed)
+            written.append(encoding)
+    return written
+
+
+def _resize(build, name, data, widths, quality):
+    """Write each width of an image in its own format and as WebP.
+
+    Returns {mimetype: [[name, width], ...]} in ascending width, or None
+    when Pillow is not installed.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    root, ext = os.path.splitext(name)
+    with Image.open(io.BytesIO(data)) as original:
+        image_format = original.format
+        image = ImageOps.exif_transpose(original)
+    sizes = sorted({width for width in widths if width < image.width} | {min(image.width, max(widths))})
+    srcsets = {Image.MIME[image_format]: [], 'image/webp': []}
+    for width in sizes:
+        resized = image if width == image.width else image.resize(
+            (width, round(image.height * width / image.width)), Image.LANCZOS)
+        for save_format, suffix in ((image_format, ext), ('WEBP', '.webp')):
+            out = io.BytesIO()
+            resized.save(out, save_format, quality=quality, optimize=True,
+                         **({'progressive': True} if save_format == 'JPEG' else {}))
+            variant = fingerprint(f'{root}-{width}w{suffix}', out.getvalue())
+            _write(build, variant, out.getvalue())
+            srcsets[Image.MIME[save_format]].append([variant, width])
+    return srcsets
+
+
+def build_folder(app):
+    return app.config['STATIC_BUILD_PATH'] or os.path.join(app.instance_path, 'static_build')
+
+
+def build_assets(static_folder, build, static_url_path='/static', widths=(640, 1280, 1920), quality=80):
+    """Write fingerprinted copies of every static file to the build folder.
+
+    Text files also get gzip and Brotli copies, and raster images resized
+    copies in their own format and WebP for srcset; an image's own name then
+    maps to its largest resized copy. /static/ URLs inside stylesheets are
+    rewritten to the fingerprinted names. Returns the manifest, which is
+    also saved as manifest.json in the build folder.
+    """
+    build = os.path.abspath(build)
+    # The folder is emptied first, so refuse one that does not hold a build
+    if os.path.isdir(build) and os.listdir(build) and not os.path.exists(os.path.join(build, MANIFEST)):
+        raise ValueError(f"{build} is not empty and holds no earlier build; choose another STATIC_BUILD_PATH.")
+    shutil.rmtree(build, ignore_errors=True)
+    manifest = {'files': {}, 'encodings': {}, 'srcsets': {}}
+
+    sources = sorted(os.path.join(directory, filename)
+                     for directory, _, filenames in os.walk(static_folder) for filename in filenames)
+    sources = [os.path.relpath(path, static_folder).replace(os.sep, '/') for path in sources
+               if not os.path.abspath(path).startswith(build + os.sep)]
+    # Images first, so stylesheets can refer to their fingerprinted names
+    sources.sort(key=lambda name: os.path.splitext(name)[1].lower() not in RESIZABLE)
+    url = re.compile(re.escape(static_url_path).encode() + rb'/([\w./-]+)')
+
+    for name in sources:
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            data = f.read()
+        ext = os.path.splitext(name)[1].lower()
+        if ext == '.css':
+            data = url.sub(lambda m: (f'{static_url_path}/{BUILD_DIR}/{manifest["files"][m[1].decode()]}'.encode()
+                                      if m[1].decode() in manifest['files'] else m[0]), data)
+        srcsets = _resize(build, name, data, widths, quality) if ext in RESIZABLE else None
+        if srcsets:
+            manifest['srcsets'][name] = srcsets
+            manifest['files'][name] = srcsets[mimetypes.guess_type(name)[0]][-1][0]
+            continue
+        built = fingerprint(name, data)
+        _write(build, built, data)
+        manifest['files'][name] = built
+        if ext in COMPRESSIBLE:
+            manifest['encodings'][built] = _compress(build, built, data)
+
+    with open(os.path.join(build, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def load_manifest(build):
+    try:
+        with open(os.path.join(build, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def srcset(filename, mimetype):
+    """srcset value for a static image's resized copies in mimetype, or ''."""
+    manifest = current_app.extensions.get('assets') or {}
+    variants = manifest.get('srcsets', {}).get(filename, {}).get(mimetype, [])
+    return ', '.join(f"{url_for('static', filename=f'{BUILD_DIR}/{name}')} {width}w" for name, width in variants)
+
+
+def init_assets(app):
+    """Serve the output of `flask build-assets` when it exists.
+
+    url_for('static', filename=...) then points at the fingerprinted copy,
+    which is sent from the build folder, precompressed when the client
+    accepts it and cached as immutable for a year. Other static files are
+    served as before.
+    """
+    app.add_template_global(srcset)
+    build = build_folder(app)
+    manifest = load_manifest(build) if app.config['STATIC_BUILD'] else None
+    if manifest is None:
+        return
+    app.extensions['assets'] = manifest
+    app.extensions['asset_version'] = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:12]
+    files = manifest['files']
+    built = {f'{BUILD_DIR}/{name}': manifest['encodings'].get(name, []) for name in files.values()}
+    built.update((f'{BUILD_DIR}/{name}', []) for srcsets in manifest['srcsets'].values()
+                 for variants in srcsets.values() for name, _ in variants)
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in files:
+            values['filename'] = f"{BUILD_DIR}/{files[values['filename']]}"
+
+    def send_static_file(filename):
+        if filename not in built:
+            return app.send_static_file(filename)
+        mimetype = mimetypes.guess_type(filename)[0]
+        encoding = next((encoding for encoding in ('br', 'gzip')
+                         if encoding in built[filename] and encoding in request.accept_encodings), None)
+        suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding, '')
+        response = send_from_directory(build, filename[len(BUILD_DIR) + 1:] + suffix, mimetype=mimetype,
+                                       max_age=IMMUTABLE_MAX_AGE)
+        if encoding:
+            response.content_encoding = encoding
+        if built[filename]:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = send_static_file
@@ -0,0 +1,158 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, and_
+from sqlalchemy.dialects.sqlite import insert
+from .models import db, Doctor, Appointment, SlotAvailability, ScheduleTemplate
+from .schedules import doctor_slots, slots_on, expand, slot_start
+from .slot_events import slots_changed
+
+
+def slot_bit(doctor, date, time):
+    try:
+        return 1 << list(doctor_slots(doctor, date)).index(time)
+    except ValueError:
+        return 0
+
+
+def booked_mask_query(doctor_id, date):
+    return select(SlotAvailability.booked_mask).filter_by(doctor_id=doctor_id, date=date)
+
+
+def booked_mask(doctor_id, date):
+    return db.session.execute(booked_mask_query(doctor_id, date)).scalar() or 0
+
+
+def day_slots(doctor, date):
+    """Return [(time, is_booked), ...] for one doctor and date from the bitmap."""
+    mask = booked_mask(doctor.id, date)
+    return [(time, bool(mask >> i & 1)) for i, time in enumerate(doctor_slots(doctor, date))]
+
+
+def mark_booked(doctor, date, time):
+    """Set the slot's bit inside the caller's transaction."""
+    bit = slot_bit(doctor, date, time)
+    table = SlotAvailability.__table__
+    db.session.execute(
+        insert(table)
+        .values(doctor_id=doctor.id, date=date, booked_mask=bit)
+        .on_conflict_do_update(
+            index_elements=[table.c.doctor_id, table.c.date],
+            set_={'booked_mask': table.c.booked_mask.op('|')(bit)},
+        )
+    )
+    slots_changed(db.session, [(doctor.id, date)])
+
+
+def merge_masks(masks):
+    """OR {(doctor_id, date): bits} into the bitmaps inside the caller's transaction."""
+    if not masks:
+        return
+    table = SlotAvailability.__table__
+    stmt = insert(table)
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[table.c.doctor_id, table.c.date],
+            set_={'booked_mask': table.c.booked_mask.op('|')(stmt.excluded.booked_mask)},
+        ),
+        [{'doctor_id': doctor_id, 'date': date, 'booked_mask': bits}
+         for (doctor_id, date), bits in masks.items()],
+    )
+    slots_changed(db.session, masks)
+
+
+def rebuild_availability(doctor_ids=None):
+    """Recompute the bitmaps from the appointments table.
+
+    Rebuilds every doctor when doctor_ids is None. Returns the number of
+    (doctor, date) rows written.
+    """
+    doctors = (select(Doctor.id, Doctor.all_time, ScheduleTemplate)
+               .outerjoin(ScheduleTemplate, Doctor.schedule_id == ScheduleTemplate.id))
+    if doctor_ids is not None:
+        doctors = doctors.where(Doctor.id.in_(doctor_ids))
+    sources = {doctor_id: (all_time, schedule)
+               for doctor_id, all_time, schedule in db.session.execute(doctors)}
+    if not sources:
+        return 0
+
+    masks = defaultdict(int)
+    booked = db.session.execute(
+        select(Appointment.doctor_id, Appointment.date, Appointment.time)
+        .where(Appointment.doctor_id.in_(sources))
+    )
+    for doctor_id, date, time in booked:
+        slots = list(slots_on(*sources[doctor_id], date))
+        if time in slots:
+            masks[doctor_id, date] |= 1 << slots.index(time)
+
+    db.session.execute(delete(SlotAvailability).where(SlotAvailability.doctor_id.in_(sources)))
+    if masks:
+        db.session.execute(
+            insert(SlotAvailability.__table__),
+            [{'doctor_id': doctor_id, 'date': date, 'booked_mask': mask}
+             for (doctor_id, date), mask in masks.items()],
+        )
+    db.session.commit()
+    return len(masks)
+
+
+def free_slots_query(clinic_id, speciality, start, end):
+    query = (
+        select(Doctor.id, Doctor.email, Doctor.all_time, ScheduleTemplate,
+               SlotAvailability.date, SlotAvailability.booked_mask)
+        .outerjoin(ScheduleTemplate, Doctor.schedule_id == ScheduleTemplate.id)
+        .outerjoin(SlotAvailability, and_(
+            SlotAvailability.doctor_id == Doctor.id,
+            SlotAvailability.date.between(start.isoformat(), end.isoformat()),
+        ))
+        .where(Doctor.clinic_id == clinic_id)
+    )
+    if speciality is not None:
+        query = query.where(Doctor.speciality == speciality)
+    return query
+
+
+def next_free_slots(clinic_id, speciality, start, end, limit, now=None):
+    """Earliest `limit` open slots between start and end (inclusive dates)
+    across every doctor of a clinic, optionally narrowed to one speciality.
+
+    One query joins the matching doctors to their schedule templates and
+    availability rows in the date window; days without a row are fully
+    free. Each distinct template is expanded over the window only once.
+    """
+    now = now or datetime.now()
+    today, minute = now.date().isoformat(), now.hour * 60 + now.minute
+
+    doctors, masks = {}, {}
+    query = free_slots_query(clinic_id, speciality, start, end)
+    for doctor_id, email, all_time, schedule, date, mask in db.session.execute(query):
+        doctors[doctor_id] = (email, all_time or [], schedule)
+        if date is not None:
+            masks[doctor_id, date] = mask
+
+    expanded = {}
+    for _, _, schedule in doctors.values():
+        if schedule is not None and schedule.id not in expanded:
+            expanded[schedule.id] = expand(schedule, start, end)
+
+    def slots(all_time, schedule, date):
+        return all_time if schedule is None else expanded[schedule.id][date]
+
+    def upcoming(date, time):
+        # Slots that have already started today are not offered
+        return date > today or (date == today and slot_start(time) > minute)
+
+    found = []
+    day = start
+    while day <= end and len(found) < limit:
+        date = day.isoformat()
+        free = [
+            (time, doctor_id, email)
+            for doctor_id, (email, all_time, schedule) in doctors.items()
+            for i, time in enumerate(slots(all_time, schedule, date))
+            if not masks.get((doctor_id, date), 0) >> i & 1 and upcoming(date, time)
+        ]
+        for time, doctor_id, email in sorted(free)[:limit - len(found)]:
+            found.append({'doctor_id': doctor_id, 'doctor_email': email, 'date': date, 'time': time})
+        day += timedelta(days=1)
+    return found
@@ -0,0 +1,126 @@
+import enum
+from datetime import date, datetime, timezone
+from sqlalchemy import select, update, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from .models import db, Doctor, Clinic, Appointment
+from .availability import mark_booked
+from .schedules import doctor_slots, parse_slot_date
+
+
+class BookingResult(enum.Enum):
+    booked = "Booking successful!"
+    already_booked = "This time slot on selected date is already booked."
+    invalid_slot = "Invalid date or time slot."
+
+
+def reserve_slot(doctor, patient, date, time):
+    """Atomically claim one doctor slot for a patient.
+
+    The insert is a single statement that either claims the slot or does
+    nothing when the unique slot index already holds a booking, so no row
+    lock or Python-side check is held between reading and writing. The
+    availability bitmap and the doctor's booking version are updated in the
+    same transaction.
+    """
+    try:
+        date = parse_slot_date(date).isoformat()
+    except ValueError:
+        return BookingResult.invalid_slot
+    if time not in doctor_slots(doctor, date):
+        return BookingResult.invalid_slot
+
+    result = db.session.execute(
+        insert(Appointment.__table__).on_conflict_do_nothing().values(
+            doctor_id=doctor.id,
+            patient_id=patient.id,
+            patient_email=patient.email,
+            date=date,
+            time=time,
+        )
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        return BookingResult.already_booked
+
+    mark_booked(doctor, date, time)
+    touch_bookings([doctor.id])
+    db.session.commit()
+    return BookingResult.booked
+
+
+def touch_bookings(doctor_ids):
+    """Record that these doctors' appointments changed, inside the caller's transaction."""
+    db.session.execute(
+        update(Doctor)
+        .where(Doctor.id.in_(doctor_ids))
+        .values(booking_version=Doctor.booking_version + 1,
+                bookings_updated_at=datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def appointments_query(doctor_id, start=None, end=None, after=None):
+    """A doctor's appointments in (date, time, id) order, optionally limited
+    to a date window and to rows after a cursor from appointment_cursor()."""
+    query = (select(Appointment)
+             .where(Appointment.doctor_id == doctor_id)
+             .order_by(Appointment.date, Appointment.time, Appointment.id))
+    if start:
+        query = query.where(Appointment.date >= start.isoformat())
+    if end:
+        query = query.where(Appointment.date <= end.isoformat())
+    if after:
+        date, time, appointment_id = after.split('_', 2)
+        query = query.where(tuple_(Appointment.date, Appointment.time, Appointment.id)
+                            > tuple_(date, time, int(appointment_id)))
+    return query
+
+
+def appointment_cursor(appointment):
+    return f'{appointment.date}_{appointment.time}_{appointment.id}'
+
+
+def appointments_page(doctor_id, start=None, end=None, after=None, per_page=50):
+    """Return (appointments, next_cursor); next_cursor is None on the last page."""
+    rows = db.session.execute(
+        appointments_query(doctor_id, start, end, after).limit(per_page + 1)
+    ).scalars().all()
+    if len(rows) > per_page:
+        return rows[:per_page], appointment_cursor(rows[per_page - 1])
+    return rows, None
+
+
+def patient_appointments_query(patient_id, upcoming=True, today=None, after=None):
+    """A patient's appointments with each doctor's email and clinic name.
+
+    Upcoming bookings (today onwards) come soonest first and past ones most
+    recent first, both read in order from the (patient_id, date, time) index.
+    after is a cursor from appointment_cursor().
+    """
+    today = (today or date.today()).isoformat()
+    key = tuple_(Appointment.date, Appointment.time, Appointment.id)
+    query = (select(Appointment, Doctor.email, Clinic.name)
+             .join(Doctor, Appointment.doctor_id == Doctor.id)
+             .join(Clinic, Doctor.clinic_id == Clinic.id)
+             .where(Appointment.patient_id == patient_id))
+    if upcoming:
+        query = query.where(Appointment.date >= today).order_by(Appointment.date, Appointment.time, Appointment.id)
+    else:
+        query = query.where(Appointment.date < today).order_by(
+            Appointment.date.desc(), Appointment.time.desc(), Appointment.id.desc())
+    if after:
+        cursor_date, cursor_time, appointment_id = after.split('_', 2)
+        cursor = tuple_(cursor_date, cursor_time, int(appointment_id))
+        query = query.where(key > cursor if upcoming else key < cursor)
+    return query
+
+
+def patient_appointments_page(patient_id, upcoming=True, after=None, per_page=50):
+    """Return (appointments, next_cursor) as dicts; next_cursor is None on the last page."""
+    rows = db.session.execute(
+        patient_appointments_query(patient_id, upcoming, after=after).limit(per_page + 1)
+    ).all()
+    next_cursor = appointment_cursor(rows[per_page - 1][0]) if len(rows) > per_page else None
+    return [{'id': appointment.id, 'doctor_id': appointment.doctor_id, 'doctor_email': doctor_email,
+             'clinic_name': clinic_name, 'date': appointment.date, 'time': appointment.time}
+            for appointment, doctor_email, clinic_name in rows[:per_page]], next_cursor
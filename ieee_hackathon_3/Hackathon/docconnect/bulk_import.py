@@ -0,0 +1,119 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from .models import db, User, Doctor, Appointment, ScheduleTemplate
+from .availability import merge_masks
+from .booking import touch_bookings
+from .schedules import slots_on, parse_slot_date
+
+FIELDS = ('doctor_email', 'date', 'time', 'patient_email')
+
+
+def read_rows(stream, fmt):
+    """Yield booking dicts from a text stream of CSV (with a header row) or JSONL."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield {}
+    else:
+        raise ValueError(f"Unknown import format {fmt!r}")
+
+
+def _valid_date(value):
+    try:
+        parse_slot_date(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _import_batch(batch, first_row):
+    rows = []
+    for raw in batch:
+        raw = raw if isinstance(raw, dict) else {}
+        row = {field: str(raw.get(field) or '').strip() for field in FIELDS}
+        row['doctor_email'] = row['doctor_email'].lower()
+        row['patient_email'] = row['patient_email'].lower()
+        rows.append(row)
+
+    doctors = {
+        email: (doctor_id, all_time, schedule)
+        for doctor_id, email, all_time, schedule in db.session.execute(
+            select(Doctor.id, Doctor.email, Doctor.all_time, ScheduleTemplate)
+            .outerjoin(ScheduleTemplate, Doctor.schedule_id == ScheduleTemplate.id)
+            .where(Doctor.email.in_({row['doctor_email'] for row in rows})))
+    }
+    patients = dict(db.session.execute(
+        select(User.email, User.id).where(User.email.in_({row['patient_email'] for row in rows}))).all())
+
+    results, candidates, seen = [], {}, set()
+    for number, row in enumerate(rows, start=first_row):
+        result = {'row': number, **row}
+        results.append(result)
+        doctor = doctors.get(row['doctor_email'])
+        if not doctor:
+            result.update(status='error', message='Unknown doctor.')
+        elif row['patient_email'] not in patients:
+            result.update(status='error', message='Unknown patient.')
+        elif not _valid_date(row['date']) or row['time'] not in slots_on(doctor[1], doctor[2], row['date']):
+            result.update(status='error', message='Invalid date or time slot.')
+        elif (doctor[0], row['date'], row['time']) in seen:
+            result.update(status='conflict', message='Slot appears twice in this import.')
+        else:
+            key = (doctor[0], row['date'], row['time'])
+            seen.add(key)
+            candidates[key] = result
+
+    if candidates:
+        # One statement checks every slot against the unique index and
+        # returns the ones that were still free
+        inserted = set(db.session.execute(
+            insert(Appointment.__table__)
+            .on_conflict_do_nothing()
+            .returning(Appointment.doctor_id, Appointment.date, Appointment.time),
+            [{'doctor_id': doctor_id, 'date': date, 'time': time,
+              'patient_id': patients[result['patient_email']], 'patient_email': result['patient_email']}
+             for (doctor_id, date, time), result in candidates.items()],
+        ).tuples())
+
+        masks = defaultdict(int)
+        sources = {doctor_id: (all_time, schedule) for doctor_id, all_time, schedule in doctors.values()}
+        for key, result in candidates.items():
+            if key in inserted:
+                doctor_id, date, time = key
+                masks[doctor_id, date] |= 1 << list(slots_on(*sources[doctor_id], date)).index(time)
+                result.update(status='booked', message='')
+            else:
+                result.update(status='conflict', message='Slot is already booked.')
+        merge_masks(masks)
+        if inserted:
+            touch_bookings({doctor_id for doctor_id, _, _ in inserted})
+    db.session.commit()
+    return results
+
+
+def import_bookings(rows, batch_size=1000):
+    """Book an iterable of {doctor_email, date, time, patient_email} dicts.
+
+    Rows are validated and conflict-checked a batch at a time with a few
+    set-based queries, and each batch is inserted and committed as one
+    transaction. Yields one result dict per input row, in input order,
+    with status 'booked', 'conflict' or 'error'.
+    """
+    rows = iter(rows)
+    first_row = 1
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield from _import_batch(batch, first_row)
+        first_row += len(batch)
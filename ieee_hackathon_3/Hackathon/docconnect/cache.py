@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from flask import current_app, render_template, session
+from markupsafe import Markup
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from .models import db, Clinic, Doctor
+from .storage import MemoryStore, SqliteStore
+from .instrumentation import record_saving
+
+
+class ReadThroughCache:
+    """Caches loader results under versioned keys.
+
+    invalidate() bumps a generation number kept in the backend itself, so
+    with a shared backend every worker stops using the old entries at once;
+    with the memory backend other workers catch up within the TTL.
+    Entries of old generations are left to expire, and expired entries are
+    swept from the backend every sweep_interval seconds.
+    """
+
+    def __init__(self, backend=None, ttl=300, namespace='cache', sweep_interval=300):
+        self.backend = backend or MemoryStore()
+        self.ttl = ttl
+        self.namespace = namespace
+        self.sweep_interval = sweep_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._next_sweep = 0
+
+    def _generation(self):
+        return self.backend.get(f'{self.namespace}:generation', 0)
+
+    def get_or_load(self, key, loader):
+        full_key = f'{self.namespace}:{self._generation()}:{key}'
+        value = self.backend.get(full_key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            value = loader()
+            self.backend.set(full_key, value, ttl=self.ttl)
+            self._sweep()
+        return value
+
+    def _sweep(self):
+        now = time.time()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        self.backend.sweep()
+
+    def invalidate(self):
+        self.backend.set(f'{self.namespace}:generation', self._generation() + 1)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+directory_cache = ReadThroughCache(namespace='directory')
+# Rendered pages and fragments; emptied together with the directory
+template_cache = ReadThroughCache(namespace='templates')
+
+
+def init_directory_cache(app):
+    for cache in (directory_cache, template_cache):
+        if app.config['DIRECTORY_CACHE_BACKEND'] == 'sqlite':
+            path = app.config['DIRECTORY_CACHE_PATH'] or os.path.join(app.instance_path, 'cache.db')
+            cache.backend = SqliteStore(path, table='directory_cache')
+        cache.ttl = app.config['DIRECTORY_CACHE_TTL']
+        cache.sweep_interval = app.config['SESSION_SWEEP_INTERVAL']
+    app.add_template_global(cache_fragment)
+    app.add_template_global(fragment_key)
+
+
+def cached_clinics():
+    def load():
+        clinics = db.session.execute(select(Clinic).order_by(Clinic.id)).scalars()
+        return [{'id': c.id, 'name': c.name, 'location': c.location} for c in clinics]
+    return directory_cache.get_or_load('clinics', load)
+
+
+def doctor_list_query(clinic_id=None, speciality=None):
+    # Clinic names come from the same query rather than one lazy load per doctor
+    query = (select(Doctor.id, Doctor.email, Doctor.speciality, Doctor.clinic_id, Clinic.name)
+             .join(Clinic, Doctor.clinic_id == Clinic.id)
+             .order_by(Doctor.id))
+    if clinic_id:
+        query = query.where(Doctor.clinic_id == clinic_id)
+    if speciality is not None:
+        query = query.where(Doctor.speciality == speciality)
+    return query
+
+
+def cached_doctors(clinic_id=None, speciality=None):
+    """Doctors listed for a clinic and speciality. Only clinics in the
+    directory get a cache entry, so made-up ids in a query string cannot
+    fill the cache."""
+    if clinic_id and clinic_id not in {clinic['id'] for clinic in cached_clinics()}:
+        return []
+
+    def load():
+        return [{'id': doctor_id, 'email': email, 'speciality': spec.name,
+                 'clinic_id': doc_clinic_id, 'clinic_name': clinic_name}
+                for doctor_id, email, spec, doc_clinic_id, clinic_name
+                in db.session.execute(doctor_list_query(clinic_id, speciality))]
+    key = f"doctors:{clinic_id or '*'}:{speciality.name if speciality else '*'}"
+    return directory_cache.get_or_load(key, load)
+
+
+def _cached_render(key, render):
+    """Cached HTML for key, rendering it on a miss. A hit adds the time the
+    original render took to the request's saved template time."""
+    rendered = []
+
+    def load():
+        started = time.perf_counter()
+        html = str(render())
+        rendered.append(True)
+        return [html, time.perf_counter() - started]
+
+    # Fingerprinted static URLs change with each asset build
+    html, seconds = template_cache.get_or_load(f"{current_app.extensions.get('asset_version', '')}:{key}", load)
+    if not rendered:
+        record_saving('template_saved', seconds)
+    return Markup(html)
+
+
+def cached_page(key, template, **context):
+    """render_template for pages that vary only by the directory and key.
+
+    Pages with flashed messages waiting are rendered afresh, since the
+    messages are part of the page.
+    """
+    if session.get('_flashes'):
+        return render_template(template, **context)
+    return _cached_render(f'page:{key}', lambda: render_template(template, **context))
+
+
+def fragment_key(value, choices):
+    """value when it is one of choices, else ''; keeps posted junk out of
+    fragment cache keys."""
+    return value if value in {str(choice) for choice in choices} else ''
+
+
+def cache_fragment(name, *inputs, caller):
+    """Jinja call block that caches its body by name and inputs:
+
+        {% call cache_fragment('clinic_options', selected_clinic) %}...{% endcall %}
+    """
+    return _cached_render(f"fragment:{name}:{':'.join(map(str, inputs))}", caller)
+
+
+# Any committed insert/update/delete of a clinic or doctor invalidates the
+# directory, whichever route or CLI command made it.
+@event.listens_for(Clinic, 'after_insert')
+@event.listens_for(Clinic, 'after_update')
+@event.listens_for(Clinic, 'after_delete')
+@event.listens_for(Doctor, 'after_insert')
+@event.listens_for(Doctor, 'after_update')
+@event.listens_for(Doctor, 'after_delete')
+def _mark_directory_changed(mapper, connection, target):
+    Session.object_session(target).info['directory_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_directory(session):
+    if session.info.pop('directory_changed', False):
+        directory_cache.invalidate()
+        template_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_directory_change(session):
+    session.info.pop('directory_changed', None)
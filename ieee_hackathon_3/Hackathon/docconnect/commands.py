@@ -0,0 +1,211 @@
+from flask import Blueprint, current_app
+from .models import db, Doctor, ScheduleTemplate, SpecialityEnum
+from .availability import rebuild_availability
+from .migrations import upgrade_database, convert_pickle_columns, migrate_booked_time, merge_accounts, SCHEMA_VERSION
+from .queryplans import check_query_plans
+from .bulk_import import read_rows, import_bookings
+from .schedules import parse_hours, parse_slot_date, validate as validate_schedule
+from .seeds import seed
+from .assets import build_assets, build_folder
+from .utils import emailcorrecting
+import click
+import json
+import os
+import pickle
+from datetime import datetime
+
+# Commands are registered directly on `flask`, not under a group
+commands = Blueprint('commands', __name__, cli_group=None)
+
+
+@commands.cli.command('init-db')
+@click.option('--default-speciality', type=click.Choice([member.name for member in SpecialityEnum]),
+              help='Speciality for doctors from databases that predate specialities.')
+@click.option('--undated-date', default=None,
+              help='YYYY-MM-DD date given to legacy bookings that were stored without one; skipped if unset.')
+@click.option('--batch-size', default=500, show_default=True, help='Doctors processed per transaction.')
+def init_db_command(default_speciality, undated_date, batch_size):
+    """Create or upgrade the database to the current schema version.
+
+    Also upgrades doc_app.db files written by the older app variants:
+    pickled bookings, bookings without dates and doctors without a
+    speciality are converted in one streaming pass.
+    """
+    try:
+        if undated_date:
+            parse_slot_date(undated_date)
+        result = upgrade_database(default_speciality, undated_date, batch_size)
+    except (ValueError, pickle.UnpicklingError) as error:
+        raise click.ClickException(str(error))
+    click.echo("\n".join(result['changes']) if result['changes'] else "Schema is up to date.")
+    if 'bookings' in result:
+        bookings = result['bookings']
+        click.echo(f"Upgraded data from version {result['from_version']} to {SCHEMA_VERSION}: "
+                   f"{result['converted']} doctors converted to JSON, "
+                   f"{bookings['inserted']} appointments migrated, {bookings['skipped']} skipped, "
+                   f"{result['accounts']['doctor'] + result['accounts']['patient']} accounts created.")
+        if bookings['undated']:
+            click.echo(f"{bookings['undated']} legacy bookings have no date and were not migrated; "
+                       "run `flask migrate-bookings --undated-date YYYY-MM-DD` to import them on a chosen day.")
+
+
+@commands.cli.command('seed')
+def seed_command():
+    """Add the default clinics and schedule template if they are missing."""
+    click.echo(f"Added {seed()} clinics.")
+
+
+@commands.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if a dashboard query stops using its expected index."""
+    failures = check_query_plans()
+    for name, plan in failures.items():
+        click.echo(f"{name}: {' | '.join(plan)}", err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo("All dashboard queries use their expected indexes.")
+
+
+@commands.cli.command('import-bookings')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Input format; guessed from the file extension by default.')
+@click.option('--batch-size', default=None, type=int, help='Rows per transaction.')
+@click.option('--report', type=click.File('w', encoding='utf-8'), default=None,
+              help='Write one JSON result per row to this file.')
+def import_bookings_command(source, fmt, batch_size, report):
+    """Bulk-book appointments from a CSV or JSONL file of doctor_email, date, time, patient_email."""
+    fmt = fmt or ('csv' if source.name.endswith('.csv') else 'jsonl')
+    started = datetime.now()
+    counts = {'booked': 0, 'conflict': 0, 'error': 0}
+    for result in import_bookings(read_rows(source, fmt), batch_size or current_app.config['BULK_IMPORT_BATCH_SIZE']):
+        counts[result['status']] += 1
+        if report:
+            report.write(json.dumps(result) + "\n")
+        elif result['status'] != 'booked':
+            click.echo(f"row {result['row']}: {result['status']}: {result['message']}", err=True)
+    seconds = (datetime.now() - started).total_seconds()
+    total = sum(counts.values())
+    click.echo(f"{total} rows in {seconds:.2f}s ({total / max(seconds, 1e-6):.0f} rows/s): "
+               f"{counts['booked']} booked, {counts['conflict']} conflicts, {counts['error']} errors.")
+
+
+@commands.cli.command('schedule-save')
+@click.argument('name')
+@click.option('--hours', required=True,
+              help="Weekly hours, e.g. 'mon-fri=09:00-13:00,14:00-18:00;sat=10:00-14:00'.")
+@click.option('--slot-minutes', default=60, show_default=True, type=int)
+@click.option('--holiday', 'holidays', multiple=True, help='YYYY-MM-DD date with no slots; repeatable.')
+def schedule_save_command(name, hours, slot_minutes, holidays):
+    """Create or replace a working-hour schedule template."""
+    template = ScheduleTemplate.query.filter_by(name=name).first() or ScheduleTemplate(name=name)
+    template.slot_minutes = slot_minutes
+    template.holidays = sorted(holidays)
+    try:
+        template.weekly_hours = parse_hours(hours)
+        validate_schedule(template)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    db.session.add(template)
+    db.session.flush()
+    # Slot positions may have moved, so the bitmaps of its doctors are stale;
+    # rebuild_availability commits the template and the bitmaps together
+    doctor_ids = [doctor_id for (doctor_id,) in db.session.query(Doctor.id).filter_by(schedule_id=template.id)]
+    try:
+        if doctor_ids:
+            rebuild_availability(doctor_ids)
+        else:
+            db.session.commit()
+    except ValueError as error:
+        db.session.rollback()
+        raise click.ClickException(str(error))
+    click.echo(f"Saved schedule {name!r} used by {len(doctor_ids)} doctors.")
+
+
+@commands.cli.command('schedule-assign')
+@click.argument('name')
+@click.argument('emails', nargs=-1, required=True)
+def schedule_assign_command(name, emails):
+    """Make the listed doctors use a schedule template."""
+    template = ScheduleTemplate.query.filter_by(name=name).first()
+    if template is None:
+        raise click.ClickException(f"No schedule named {name!r}.")
+    wanted = {emailcorrecting(email): email for email in emails}
+    doctors = Doctor.query.filter(Doctor.email.in_(wanted)).all()
+    found = {doctor.email for doctor in doctors}
+    missing = [email for normalized, email in wanted.items() if normalized not in found]
+    if missing:
+        raise click.BadParameter(f"No doctor with email {', '.join(missing)}.", param_hint='EMAILS')
+    for doctor in doctors:
+        doctor.schedule = template
+    # The assignment is committed together with the rebuilt bitmaps
+    try:
+        rebuild_availability([doctor.id for doctor in doctors])
+    except ValueError as error:
+        db.session.rollback()
+        raise click.ClickException(str(error))
+    click.echo(f"Assigned {len(doctors)} doctors to {name!r}.")
+
+
+@commands.cli.command('convert-pickles')
+@click.option('--batch-size', default=500, show_default=True, help='Doctors rewritten per transaction.')
+def convert_pickles_command(batch_size):
+    """Rewrite pickled doctor slot columns as JSON."""
+    click.echo(f"Converted {convert_pickle_columns(batch_size=batch_size)} doctors to JSON.")
+
+
+@commands.cli.command('migrate-bookings')
+@click.option('--batch-size', default=500, show_default=True, help='Doctors loaded per batch.')
+@click.option('--undated-date', default=None, help='YYYY-MM-DD date for bookings stored without one; skipped if unset.')
+def migrate_bookings_command(batch_size, undated_date):
+    """Move legacy Doctor.booked_time entries into the appointments table."""
+    if undated_date:
+        try:
+            parse_slot_date(undated_date)
+        except ValueError as error:
+            raise click.ClickException(str(error))
+    stats = migrate_booked_time(batch_size=batch_size, undated_date=undated_date)
+    click.echo(f"Scanned {stats['doctors']} doctors: "
+               f"{stats['inserted']} appointments inserted, {stats['skipped']} skipped, "
+               f"{stats['undated']} without a date left out.")
+
+
+@commands.cli.command('rebuild-availability')
+def rebuild_availability_command():
+    """Recompute every doctor's slot availability bitmaps from appointments."""
+    click.echo(f"Wrote {rebuild_availability()} availability rows.")
+
+
+@commands.cli.command('merge-accounts')
+def merge_accounts_command():
+    """Create login accounts for patients and doctors registered before accounts existed."""
+    merged = merge_accounts()
+    click.echo(f"Merged {merged['doctor']} doctors and {merged['patient']} patients into accounts.")
+
+
+@commands.cli.command('build-assets')
+@click.option('--width', 'widths', type=int, multiple=True, default=(640, 1280, 1920), show_default=True,
+              help='Widths resized images are written at; repeat for several.')
+@click.option('--quality', default=80, show_default=True, help='JPEG and WebP quality of resized images.')
+def build_assets_command(widths, quality):
+    """Fingerprint, precompress and resize static files into STATIC_BUILD_PATH.
+
+    Resized images need Pillow and Brotli copies need Brotli
+    (pip install docconnect[assets]); without them those steps are skipped.
+    """
+    static, build = current_app.static_folder, build_folder(current_app)
+    try:
+        manifest = build_assets(static, build, current_app.static_url_path, widths, quality)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    for name, built in sorted(manifest['files'].items()):
+        size = os.path.getsize(os.path.join(static, name))
+        srcsets = manifest['srcsets'].get(name, {})
+        variants = [] if srcsets else [(os.path.basename(built), os.path.getsize(os.path.join(build, built)))]
+        variants += [(encoding, os.path.getsize(os.path.join(build, built + suffix)))
+                     for encoding, suffix in (('gzip', '.gz'), ('br', '.br'))
+                     if encoding in manifest['encodings'].get(built, [])]
+        variants += [(f'{width}w {mimetype.split("/")[1]}', os.path.getsize(os.path.join(build, variant)))
+                     for mimetype, srcset in srcsets.items() for variant, width in srcset]
+        click.echo(f"{name} ({size / 1024:.1f} KiB): " +
+                   ", ".join(f"{label} {variant_size / 1024:.1f} KiB" for label, variant_size in variants))
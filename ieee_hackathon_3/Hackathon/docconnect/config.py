@@ -0,0 +1,84 @@
+import json
+import os
+
+
+class Config:
+    # Shared by every worker; when unset, a key is generated once into instance/secret_key
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+
+    # 'sqlite' (shared by workers on the host), 'memory' (single process) or 'cookie'
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite')
+    SESSION_DB_PATH = os.environ.get('SESSION_DB_PATH')  # defaults to instance/sessions.db
+    SESSION_HOT_CACHE_SIZE = int(os.environ.get('SESSION_HOT_CACHE_SIZE', 10000))
+    # How often expired sessions, cache entries and rate-limit buckets are swept
+    SESSION_SWEEP_INTERVAL = int(os.environ.get('SESSION_SWEEP_INTERVAL', 300))
+
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///doc_app.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connections kept per worker process
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+
+    # Applied to every connection of a SQLite file database
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000))
+
+    # Clinic and doctor listings and the pages built from them: 'sqlite' shared
+    # by workers on the host, or 'memory' per worker, where a change made in
+    # one worker can take up to DIRECTORY_CACHE_TTL to reach the others
+    DIRECTORY_CACHE_BACKEND = os.environ.get('DIRECTORY_CACHE_BACKEND', 'sqlite')
+    DIRECTORY_CACHE_PATH = os.environ.get('DIRECTORY_CACHE_PATH')  # defaults to instance/cache.db
+    DIRECTORY_CACHE_TTL = int(os.environ.get('DIRECTORY_CACHE_TTL', 300))
+
+    # Serialized calendar feeds kept per (doctor, range)
+    EVENT_FEED_CACHE_SIZE = int(os.environ.get('EVENT_FEED_CACHE_SIZE', 2000))
+
+    # Live slot streams on the patient dashboard: how often each stream
+    # re-reads its bitmap, and how long before the browser reconnects
+    SLOT_STREAM_POLL_SECONDS = float(os.environ.get('SLOT_STREAM_POLL_SECONDS', 2))
+    SLOT_STREAM_MAX_SECONDS = int(os.environ.get('SLOT_STREAM_MAX_SECONDS', 55))
+    # Each stream holds a worker thread: keep this below the threads per
+    # worker process, and set it to 0 for single-threaded (sync) workers.
+    # Dashboards refused a stream poll the JSON endpoint instead.
+    SLOT_STREAM_MAX_STREAMS = int(os.environ.get('SLOT_STREAM_MAX_STREAMS', 8))
+    SLOT_FALLBACK_POLL_SECONDS = int(os.environ.get('SLOT_FALLBACK_POLL_SECONDS', 10))
+
+    # Serve the fingerprinted, precompressed files `flask build-assets` writes
+    # to STATIC_BUILD_PATH; set to 0 while editing static files without rebuilding
+    STATIC_BUILD = os.environ.get('STATIC_BUILD', '1') == '1'
+    STATIC_BUILD_PATH = os.environ.get('STATIC_BUILD_PATH')  # defaults to instance/static_build
+
+    # Front-desk bulk booking import; the HTTP endpoint is disabled while unset
+    BULK_IMPORT_TOKEN = os.environ.get('BULK_IMPORT_TOKEN')
+    BULK_IMPORT_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', 1000))
+
+    # Requests slower than this are logged on the 'slow_requests' logger
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+    # Adds an X-SQL-Statements header to every response; for benchmarks only
+    SQL_COUNT_HEADER = os.environ.get('SQL_COUNT_HEADER', '') == '1'
+
+    # Token buckets for POSTs, 'burst/seconds' per client address ('ip') and
+    # per account ('account'); RATE_LIMITS replaces the table as JSON
+    RATE_LIMITS = json.loads(os.environ['RATE_LIMITS']) if 'RATE_LIMITS' in os.environ else {
+        'main.login': {'ip': '20/60', 'account': '5/60'},
+        'main.register': {'ip': '5/60', 'account': '3/60'},
+        'main.dashboard': {'ip': '60/60', 'account': '30/60'},
+    }
+    # 'memory' per worker, 'sqlite' shared by workers on the host, or 'off'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_PATH = os.environ.get('RATE_LIMIT_PATH')  # defaults to instance/ratelimit.db
+    RATE_LIMIT_MAX_BUCKETS = int(os.environ.get('RATE_LIMIT_MAX_BUCKETS', 100000))
+    # Proxies in front of the app that append to X-Forwarded-For. Behind a
+    # load balancer set this to 1 (or the number of hops), or every client
+    # shares the balancer's address and so its 'ip' buckets; leave it at 0
+    # when clients connect directly, as they could then forge the header
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+
+    # bcrypt cost factor; existing hashes below it are upgraded on login
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    # Hashing worker processes (0 hashes on the request thread)
+    HASH_WORKERS = int(os.environ.get('HASH_WORKERS', os.cpu_count() or 1))
+    # Hash jobs allowed in flight before requests get a 503
+    HASH_MAX_PENDING = int(os.environ.get('HASH_MAX_PENDING', 4 * (os.cpu_count() or 1)))
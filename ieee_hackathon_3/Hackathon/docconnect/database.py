@@ -0,0 +1,44 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from .models import db
+
+
+def sqlite_pragmas(config):
+    """PRAGMA statements run on every new SQLite connection."""
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",
+    ]
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    for pragma in pragmas:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def _is_sqlite_memory(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def init_database(app):
+    """Bind db to the app with pool sizing and, for SQLite files, the
+    WAL / busy-timeout pragmas from the config."""
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if not _is_sqlite_memory(url):
+        options.setdefault('pool_size', app.config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', app.config['DB_MAX_OVERFLOW'])
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    db.init_app(app)
+
+    if url.get_backend_name() == 'sqlite' and not _is_sqlite_memory(url):
+        pragmas = sqlite_pragmas(app.config)
+        with app.app_context():
+            event.listen(db.engine, 'connect',
+                         lambda dbapi_connection, _: apply_pragmas(dbapi_connection, pragmas))
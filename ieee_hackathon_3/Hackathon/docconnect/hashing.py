@@ -0,0 +1,79 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from .instrumentation import timed
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full; the app answers with a 503."""
+
+
+# bcrypt is imported on first use so app startup and CLI commands skip it
+
+def _hash(password, rounds):
+    import bcrypt
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password, hashed):
+    import bcrypt
+    return bcrypt.checkpw(password, hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded process pool so a login burst cannot pin
+    every request worker on hashing.
+
+    At most HASH_MAX_PENDING jobs are queued or running; beyond that
+    HashingBusy is raised instead of waiting.
+    """
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.workers = 0
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rounds = app.config['BCRYPT_ROUNDS']
+        self.workers = app.config['HASH_WORKERS']
+        self._slots = threading.BoundedSemaphore(app.config['HASH_MAX_PENDING'])
+
+    def _pool(self):
+        # Created on first use so forked server workers each get their own.
+        # That happens on a request thread, and forking a threaded process
+        # can leave a child stuck on a lock another thread held, so the
+        # hashing processes come from a forkserver (spawn where it is missing)
+        with self._lock:
+            if self._executor is None:
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context(method))
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            with timed('hash'):
+                if not self.workers:
+                    return fn(*args)
+                return self._pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash_password(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def check_password(self, password, hashed):
+        return self._run(_check, password, hashed)
+
+    def needs_rehash(self, hashed):
+        # bcrypt hashes look like $2b$<rounds>$<salt+hash>
+        return int(hashed.split(b'$')[2]) < self.rounds
+
+
+hasher = PasswordHasher()
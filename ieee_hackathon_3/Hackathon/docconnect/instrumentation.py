@@ -0,0 +1,180 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from .models import db
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+slow_request_log = logging.getLogger('slow_requests')
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one series per endpoint."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, value):
+        with self._lock:
+            counts, total = self._series.get(endpoint, ([0] * (len(self.buckets) + 1), 0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._series[endpoint] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((endpoint, list(counts), total) for endpoint, (counts, total) in self._series.items())
+        for endpoint, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{endpoint="{endpoint}"}} {total}')
+            lines.append(f'{self.name}_count{{endpoint="{endpoint}"}} {cumulative}')
+        return lines
+
+
+REQUEST_METRICS = {
+    'wall': Histogram('request_duration_seconds', 'Time spent handling the request.', DURATION_BUCKETS),
+    'sql': Histogram('request_sql_duration_seconds', 'Time spent running SQL statements.', DURATION_BUCKETS),
+    'sql_count': Histogram('request_sql_statements', 'SQL statements run per request.', COUNT_BUCKETS),
+    'hash': Histogram('request_hash_duration_seconds', 'Time spent hashing or checking passwords.',
+                      DURATION_BUCKETS),
+    'template': Histogram('request_template_duration_seconds', 'Time spent rendering templates.',
+                          DURATION_BUCKETS),
+    'template_saved': Histogram('request_template_saved_seconds',
+                                'Render time skipped by serving cached pages and fragments.', DURATION_BUCKETS),
+}
+
+
+@contextmanager
+def record_queries(engine):
+    """Collect the SQL statements engine runs inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def request_queries():
+    """SQL statements run so far while handling the current request."""
+    return g.setdefault('sql_statements', [])
+
+
+def request_timings():
+    """Seconds spent so far in this request, by kind ('sql', 'hash', 'template'),
+    and seconds saved by caching ('template_saved')."""
+    return g.setdefault('timings', {'sql': 0.0, 'hash': 0.0, 'template': 0.0, 'template_saved': 0.0})
+
+
+@contextmanager
+def timed(kind):
+    """Add the time spent inside the block to this request's timings."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context():
+            request_timings()[kind] += time.perf_counter() - started
+
+
+def record_saving(kind, seconds):
+    """Record seconds of work this request skipped, e.g. a cached render."""
+    if has_request_context():
+        request_timings()[kind] += seconds
+
+
+def render_metrics(extra=()):
+    lines = [line for histogram in REQUEST_METRICS.values() for line in histogram.render()]
+    return '\n'.join([*lines, *extra]) + '\n'
+
+
+def init_instrumentation(app):
+    """Time every request, its SQL, password hashing and template rendering.
+
+    Per-endpoint histograms are kept in REQUEST_METRICS for the /metrics
+    endpoint; requests slower than SLOW_REQUEST_MS are logged as one JSON
+    line on the 'slow_requests' logger. With SQL_COUNT_HEADER each response
+    carries its statement count in X-SQL-Statements. Streamed response bodies are not
+    included in the timings.
+    """
+    threshold = app.config['SLOW_REQUEST_MS'] / 1000
+    count_header = app.config['SQL_COUNT_HEADER']
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            request_queries().append(statement)
+            # Statements on one connection run one at a time
+            conn.info['query_started'] = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('query_started', None)
+        if started is not None and has_request_context():
+            request_timings()['sql'] += time.perf_counter() - started
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', after_cursor_execute)
+
+    def template_started(sender, template, context, **extra):
+        g.template_started = time.perf_counter()
+
+    def template_finished(sender, template, context, **extra):
+        started = g.pop('template_started', None)
+        if started is not None:
+            request_timings()['template'] += time.perf_counter() - started
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'request_started' not in g:
+            return response
+        wall = time.perf_counter() - g.request_started
+        endpoint = request.endpoint or 'unmatched'
+        timings = request_timings()
+        statements = len(request_queries())
+
+        REQUEST_METRICS['wall'].observe(endpoint, wall)
+        REQUEST_METRICS['sql_count'].observe(endpoint, statements)
+        for kind in ('sql', 'hash', 'template', 'template_saved'):
+            REQUEST_METRICS[kind].observe(endpoint, timings[kind])
+
+        app.logger.debug('%s %s ran %d SQL statements', request.method, request.path, statements)
+        if count_header:
+            response.headers['X-SQL-Statements'] = str(statements)
+        if wall >= threshold:
+            slow_request_log.warning(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'duration_ms': round(wall * 1000, 1),
+                'sql_statements': statements,
+                'sql_ms': round(timings['sql'] * 1000, 1),
+                'hash_ms': round(timings['hash'] * 1000, 1),
+                'template_ms': round(timings['template'] * 1000, 1),
+                'template_saved_ms': round(timings['template_saved'] * 1000, 1),
+            }))
+        return response
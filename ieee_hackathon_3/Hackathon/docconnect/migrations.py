@@ -0,0 +1,270 @@
+import io
+import pickle
+from sqlalchemy import select, update, func, literal, inspect, text, type_coerce, LargeBinary, or_
+from sqlalchemy.dialects.sqlite import insert
+from .models import db, User, Doctor, Appointment, Account, SpecialityEnum
+from .availability import rebuild_availability
+from .booking import touch_bookings
+from .schedules import parse_slot_date
+
+# Stored in SQLite's user_version. 0 covers databases written by any of
+# the original app variants: bookings pickled on the doctor row, some
+# without dates, and in the oldest variant doctors without a speciality.
+# 1 keeps bookings in the appointments table and slot lists as JSON.
+# 2 links every appointment whose email matches a user to that user.
+SCHEMA_VERSION = 2
+
+
+def upgrade_schema():
+    """Bring an existing database up to the current models.
+
+    Creates missing tables, adds missing columns and creates missing
+    indexes; db.create_all() alone only does the first. New columns on
+    existing tables must be nullable or have a server default.
+    Returns a list of the changes made.
+    """
+    engine = db.engine
+    existing = inspect(engine)
+    changes = []
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not existing.has_table(table.name):
+                table.create(conn)
+                changes.append(f'created table {table.name}')
+                continue
+
+            columns = {column['name'] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    raise RuntimeError(f'{table.name}.{column.name} needs a server default to be added')
+                column_type = column.type.compile(dialect=engine.dialect)
+                default = ''
+                if column.server_default is not None:
+                    arg = column.server_default.arg
+                    default = f" DEFAULT '{arg}'" if isinstance(arg, str) else f' DEFAULT {arg.text}'
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}'))
+                changes.append(f'added column {table.name}.{column.name}')
+
+            indexes = {index['name'] for index in existing.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    changes.append(f'created index {index.name}')
+
+    return changes
+
+
+def migrate_booked_time(batch_size=500, undated_date=None):
+    """Copy the legacy Doctor.booked_time lists into the appointments table.
+
+    Doctors are read in id order, batch_size at a time, so only one batch of
+    lists is in memory at once. Rows that already exist are skipped,
+    so the migration can be re-run safely. The availability bitmaps of each
+    batch are rebuilt once its appointments are in. Bookings made before
+    dates were recorded get undated_date, or are skipped and counted as
+    'undated' when it is None. Dates are checked with parse_slot_date, and
+    bookings with any other spelling, such as '2030-1-7', are skipped
+    rather than stored as a second copy of the day.
+    """
+    stats = {'doctors': 0, 'inserted': 0, 'skipped': 0, 'undated': 0}
+    last_id = 0
+
+    while True:
+        batch = db.session.execute(
+            select(Doctor.id, Doctor.booked_time)
+            .where(Doctor.id > last_id)
+            .order_by(Doctor.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        rows = []
+        for doctor_id, booked in batch:
+            stats['doctors'] += 1
+            for slot in booked or []:
+                slot_date = slot.get('date') or undated_date
+                if not slot_date:
+                    stats['undated'] += 1
+                    continue
+                try:
+                    slot_date = parse_slot_date(slot_date).isoformat()
+                except ValueError:
+                    stats['skipped'] += 1
+                    continue
+                if not slot.get('time'):
+                    stats['skipped'] += 1
+                    continue
+                rows.append({
+                    'doctor_id': doctor_id,
+                    'patient_email': slot.get('patient_email', ''),
+                    'date': slot_date,
+                    'time': str(slot['time']),
+                })
+
+        emails = {row['patient_email'] for row in rows}
+        patient_ids = dict(db.session.execute(
+            select(User.email, User.id).where(User.email.in_(emails))
+        ).all()) if emails else {}
+        for row in rows:
+            row['patient_id'] = patient_ids.get(row['patient_email'])
+
+        if rows:
+            result = db.session.execute(
+                insert(Appointment.__table__).on_conflict_do_nothing(),
+                rows,
+            )
+            inserted = max(result.rowcount, 0)
+            stats['inserted'] += inserted
+            stats['skipped'] += len(rows) - inserted
+            if inserted:
+                touch_bookings({row['doctor_id'] for row in rows})
+        db.session.commit()
+        rebuild_availability([doctor_id for doctor_id, _ in batch])
+
+    return stats
+
+
+def merge_accounts():
+    """Create an accounts row for every existing patient and doctor.
+
+    Emails are normalized the same way registration does. Doctors are
+    merged first, so if an email exists under both roles the doctor keeps
+    it, as login used to check doctors first. Existing accounts are left
+    untouched, so this can be re-run safely.
+    """
+    merged = {}
+    sources = [
+        ('doctor', Doctor, Account.doctor_id),
+        ('patient', User, Account.user_id),
+    ]
+    for role, model, profile_column in sources:
+        # SQLite needs a WHERE clause before ON CONFLICT in INSERT ... SELECT
+        rows = (select(func.lower(func.trim(model.email)), literal(role), model.password, model.id)
+                .where(model.id.is_not(None)))
+        result = db.session.execute(
+            insert(Account.__table__)
+            .from_select(['email', 'role', 'password', profile_column.key], rows)
+            .on_conflict_do_nothing()
+        )
+        merged[role] = max(result.rowcount, 0)
+    db.session.commit()
+    return merged
+
+
+class _DataOnlyUnpickler(pickle.Unpickler):
+    # The legacy columns only ever held lists, dicts and strings;
+    # booked_time lists were pickled as SQLAlchemy MutableLists
+    allowed = {('sqlalchemy.ext.mutable', 'MutableList'): list}
+
+    def find_class(self, module, name):
+        if (module, name) in self.allowed:
+            return self.allowed[module, name]
+        raise pickle.UnpicklingError(f'refusing to load {module}.{name}')
+
+
+def _unpickle(value):
+    return _DataOnlyUnpickler(io.BytesIO(value)).load()
+
+
+def convert_pickle_columns(batch_size=500):
+    """Rewrite pickled Doctor.all_time / booked_time values as JSON.
+
+    Only rows still holding a BLOB are read, batch_size at a time, and each
+    batch is committed on its own, so the conversion streams through large
+    tables and is cheap to re-run. Returns the number of doctors converted.
+    """
+    # Read the raw column bytes; the JSON type would try to decode them
+    raw_columns = [type_coerce(Doctor.all_time, LargeBinary), type_coerce(Doctor.booked_time, LargeBinary)]
+    pickled = or_(*(func.typeof(column) == 'blob' for column in (Doctor.all_time, Doctor.booked_time)))
+    converted = 0
+    last_id = 0
+
+    while True:
+        batch = db.session.execute(
+            select(Doctor.id, *raw_columns)
+            .where(pickled, Doctor.id > last_id)
+            .order_by(Doctor.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return converted
+        last_id = batch[-1][0]
+
+        for doctor_id, all_time, booked_time in batch:
+            values = {name: _unpickle(value)
+                      for name, value in (('all_time', all_time), ('booked_time', booked_time))
+                      if isinstance(value, bytes)}
+            db.session.execute(update(Doctor.__table__).where(Doctor.id == doctor_id).values(**values))
+            converted += 1
+        db.session.commit()
+
+
+def schema_version():
+    return db.session.execute(text('PRAGMA user_version')).scalar()
+
+
+def _add_speciality_column(default_speciality):
+    # The oldest variant had no specialities, and the column is NOT NULL
+    existing = inspect(db.engine)
+    if not existing.has_table('doctor'):
+        return []
+    if 'speciality' in {column['name'] for column in existing.get_columns('doctor')}:
+        return []
+    if default_speciality is None:
+        raise ValueError("Doctors in this database have no speciality; a default speciality is required.")
+    name = SpecialityEnum[default_speciality].name
+    with db.engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE doctor ADD COLUMN speciality VARCHAR(13) NOT NULL DEFAULT '{name}'"))
+    return [f'added column doctor.speciality defaulting to {name}']
+
+
+def backfill_patient_ids(batch_size=5000):
+    """Set appointments.patient_id from patient_email where it is missing.
+
+    Appointments are scanned in id order, batch_size ids per transaction.
+    Returns the number of appointments linked to a user.
+    """
+    patient = select(User.id).where(User.email == Appointment.patient_email)
+    linked = 0
+    last_id = 0
+    max_id = db.session.execute(select(func.max(Appointment.id))).scalar() or 0
+
+    while last_id < max_id:
+        result = db.session.execute(
+            update(Appointment.__table__)
+            .where(Appointment.id > last_id, Appointment.id <= last_id + batch_size,
+                   Appointment.patient_id.is_(None), patient.exists())
+            .values(patient_id=patient.limit(1).scalar_subquery())
+        )
+        db.session.commit()
+        linked += max(result.rowcount, 0)
+        last_id += batch_size
+    return linked
+
+
+def upgrade_database(default_speciality=None, undated_date=None, batch_size=500):
+    """Bring a database written by any app variant up to SCHEMA_VERSION.
+
+    Schema changes always run. Each data pass runs once, while the stored
+    version is older than the one that introduced it, streaming through
+    the doctors or appointments in batches.
+    """
+    version = schema_version()
+    result = {'from_version': version, 'changes': _add_speciality_column(default_speciality) + upgrade_schema()}
+    if version >= SCHEMA_VERSION:
+        return result
+
+    if version < 1:
+        result['converted'] = convert_pickle_columns(batch_size)
+        result['bookings'] = migrate_booked_time(batch_size, undated_date)
+        result['accounts'] = merge_accounts()
+    if version < 2:
+        result['patients_linked'] = backfill_patient_ids()
+    db.session.execute(text(f'PRAGMA user_version = {SCHEMA_VERSION}'))
+    db.session.commit()
+    return result
@@ -0,0 +1,113 @@
+import enum
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.ext.mutable import MutableList
+from sqlalchemy.orm import validates
+
+db = SQLAlchemy()
+
+class SpecialityEnum(enum.Enum):
+    oncologist = "Oncologist"
+    dermatologist = "Dermatologist"
+    neurologist = "Neurologist"
+    pediatrician = "Pediatrician"
+    orthodontist = "Orthodontist"
+
+
+class User(db.Model):
+    __tablename__ = 'users'
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String, unique=True, nullable=False)
+    # Legacy copy of Account.password, which logins check; kept in step
+    password = db.Column(db.LargeBinary, nullable=False)
+
+class Doctor(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String, unique=True, nullable=False)
+    # Legacy copy of Account.password, which logins check; kept in step
+    password = db.Column(db.LargeBinary, nullable=False)
+    speciality = db.Column(db.Enum(SpecialityEnum), nullable=False, index=True)
+    # JSON text; rows written before this were pickles, see migrations.convert_pickle_columns
+    all_time = db.Column(db.JSON)
+    booked_time = db.Column(MutableList.as_mutable(db.JSON), default=list)
+    clinic_id = db.Column(db.Integer, db.ForeignKey('clinic.id'), nullable=False)
+    # Working hours; doctors without a schedule use their legacy all_time list
+    schedule_id = db.Column(db.Integer, db.ForeignKey('schedule_templates.id'))
+    schedule = db.relationship('ScheduleTemplate', lazy='joined')
+    # Bumped on every change to the doctor's appointments; drives calendar ETags
+    booking_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    bookings_updated_at = db.Column(db.DateTime)
+    clinic = db.relationship('Clinic', back_populates='doctors')
+    appointments = db.relationship('Appointment', back_populates='doctor', lazy='dynamic')
+
+    # Serves clinic-only and clinic + speciality doctor filters
+    __table_args__ = (
+        db.Index('ix_doctor_clinic_speciality', 'clinic_id', 'speciality'),
+    )
+
+    @validates('all_time')
+    def validate_all_time(self, key, value):
+        if value is not None and not all(isinstance(slot, str) for slot in value):
+            raise ValueError("all_time must be a list of slot labels.")
+        return value
+
+    @validates('booked_time')
+    def validate_booked_time(self, key, value):
+        if value is not None and not all(isinstance(slot, dict) for slot in value):
+            raise ValueError("booked_time must be a list of booking objects.")
+        return value
+
+class ScheduleTemplate(db.Model):
+    __tablename__ = 'schedule_templates'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), unique=True, nullable=False)
+    slot_minutes = db.Column(db.Integer, nullable=False, default=60)
+    # {"0": [["10:00", "13:00"], ["14:00", "23:00"]], ...} keyed by weekday
+    # (Monday = 0); gaps between ranges are breaks
+    weekly_hours = db.Column(db.JSON, nullable=False)
+    holidays = db.Column(db.JSON, nullable=False, default=list)  # ['YYYY-MM-DD', ...]
+
+class Clinic(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    location = db.Column(db.String(120), nullable=False)
+    doctors = db.relationship('Doctor', back_populates='clinic', lazy=True)
+
+class Appointment(db.Model):
+    __tablename__ = 'appointments'
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    patient_email = db.Column(db.String, nullable=False)
+    date = db.Column(db.String(10), nullable=False)  # YYYY-MM-DD
+    time = db.Column(db.String(5), nullable=False)
+    doctor = db.relationship('Doctor', back_populates='appointments')
+
+    # One booking per doctor slot; also serves (doctor_id, date) range lookups
+    __table_args__ = (
+        db.Index('ix_appointment_slot', 'doctor_id', 'date', 'time', unique=True),
+        # A patient's bookings in date order; SQLite appends the id itself
+        db.Index('ix_appointment_patient', 'patient_id', 'date', 'time'),
+    )
+
+class SlotAvailability(db.Model):
+    __tablename__ = 'slot_availability'
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), primary_key=True)
+    date = db.Column(db.String(10), primary_key=True)
+    # Bit i is set when the doctor's i-th slot of this date is booked
+    booked_mask = db.Column(db.Integer, nullable=False, default=0)
+
+class Account(db.Model):
+    """Login identity for patients and doctors, looked up by normalized email."""
+    __tablename__ = 'accounts'
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String, unique=True, nullable=False)
+    role = db.Column(db.String(10), nullable=False)  # 'patient' or 'doctor'
+    password = db.Column(db.LargeBinary, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), unique=True)
+    user = db.relationship('User')
+    doctor = db.relationship('Doctor')
+
+    @property
+    def profile_id(self):
+        return self.doctor_id if self.role == 'doctor' else self.user_id
@@ -0,0 +1,66 @@
+import re
+from datetime import date
+from sqlalchemy import select
+from .models import db, Appointment, SpecialityEnum
+from .cache import doctor_list_query
+from .booking import patient_appointments_query
+from .availability import booked_mask_query, free_slots_query
+
+
+def dashboard_queries():
+    """The hot patient and doctor dashboard queries, with sample parameters."""
+    today = date.today()
+    return {
+        'doctors by clinic': doctor_list_query(1),
+        'doctors by speciality': doctor_list_query(None, SpecialityEnum.oncologist),
+        'doctors by clinic and speciality': doctor_list_query(1, SpecialityEnum.oncologist),
+        'day availability': booked_mask_query(1, today.isoformat()),
+        'free slot search': free_slots_query(1, SpecialityEnum.oncologist, today, today),
+        'doctor appointments': select(Appointment).where(Appointment.doctor_id == 1)
+                                                  .order_by(Appointment.date, Appointment.time),
+        'patient upcoming appointments': patient_appointments_query(1, True, today),
+        'patient past appointments': patient_appointments_query(1, False, today),
+    }
+
+
+# The index each dashboard query must search; a plan falling back to a
+# less selective index is as much a regression as a full scan. The
+# slot_availability index is the one SQLite builds for its primary key.
+EXPECTED_INDEXES = {
+    'doctors by clinic': 'ix_doctor_clinic_speciality',
+    'doctors by speciality': 'ix_doctor_speciality',
+    'doctors by clinic and speciality': 'ix_doctor_clinic_speciality',
+    'day availability': 'sqlite_autoindex_slot_availability_1',
+    'free slot search': 'ix_doctor_clinic_speciality',
+    'doctor appointments': 'ix_appointment_slot',
+    'patient upcoming appointments': 'ix_appointment_patient',
+    'patient past appointments': 'ix_appointment_patient',
+}
+
+
+def explain(query):
+    """EXPLAIN QUERY PLAN detail lines for a query (SQLite only)."""
+    sql = query.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')
+    return [row[3] for row in rows]
+
+
+def full_scans(plan):
+    return [line for line in plan if line.startswith('SCAN ') and 'USING' not in line]
+
+
+def uses_index(plan, index):
+    """Whether a plan line searches or scans by the named index."""
+    pattern = re.compile(rf'USING (COVERING )?INDEX {re.escape(index)}\b')
+    return any(pattern.search(line) for line in plan)
+
+
+def check_query_plans():
+    """Return {name: plan} for every dashboard query that scans a whole
+    table or does not use its index from EXPECTED_INDEXES."""
+    failures = {}
+    for name, query in dashboard_queries().items():
+        plan = explain(query)
+        if full_scans(plan) or not uses_index(plan, EXPECTED_INDEXES[name]):
+            failures[name] = plan
+    return failures
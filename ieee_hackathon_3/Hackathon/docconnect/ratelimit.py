@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from collections import Counter
+from flask import request, session
+from .storage import MemoryStore, SqliteStore
+from .utils import emailcorrecting
+
+
+def parse_limit(limit):
+    """'5/60' -> (5, 60.0): a burst of 5 requests, refilled over 60 seconds."""
+    capacity, seconds = limit.split('/')
+    return int(capacity), float(seconds)
+
+
+class TokenBuckets:
+    """Token buckets kept in a MemoryStore or SqliteStore.
+
+    Each bucket is stored as [tokens, updated_at] and expires once it would
+    have refilled completely, so idle clients cost nothing. A bucket evicted
+    from a full MemoryStore simply starts again full. With a SqliteStore
+    the read and write are not one transaction, so a burst spread over
+    several workers can get a few requests past a bucket.
+    """
+
+    def __init__(self, backend=None, sweep_interval=300):
+        self.backend = backend or MemoryStore()
+        self.sweep_interval = sweep_interval
+        self.rejected = Counter()
+        self._lock = threading.Lock()
+        self._next_sweep = 0
+
+    def take(self, key, capacity, seconds):
+        """Take one token; returns 0 when allowed, else seconds until one is free."""
+        rate = capacity / seconds
+        now = time.time()
+        with self._lock:
+            tokens, updated = self.backend.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.backend.set(key, [tokens, now], ttl=seconds)
+            sweep = now >= self._next_sweep
+            if sweep:
+                self._next_sweep = now + self.sweep_interval
+        if sweep:
+            self.backend.sweep()
+        return 0 if allowed else (1 - tokens) / rate
+
+    def reject(self, endpoint, scope):
+        with self._lock:
+            self.rejected[endpoint, scope] += 1
+
+    def metrics(self):
+        with self._lock:
+            rejected = sorted(self.rejected.items())
+        return ['# HELP rate_limit_rejected_total Requests refused with 429 by the rate limiter.',
+                '# TYPE rate_limit_rejected_total counter'] + [
+            f'rate_limit_rejected_total{{endpoint="{endpoint}",scope="{scope}"}} {count}'
+            for (endpoint, scope), count in rejected]
+
+
+rate_limiter = TokenBuckets()
+
+
+def request_account():
+    """The account a request acts for: the username being logged in or
+    registered, else the logged-in profile."""
+    username = emailcorrecting(request.form.get('username', ''))
+    if username:
+        return f'email:{username}'
+    if 'user_id' in session:
+        return f"{session.get('role')}:{session['user_id']}"
+    return None
+
+
+def init_rate_limits(app):
+    """Refuse POSTs to the endpoints in RATE_LIMITS once a bucket is empty.
+
+    Every endpoint may limit by client address ('ip') and by account
+    ('account'). The check runs in before_request, ahead of the view and so
+    of any database query or password hash, and answers 429 with a
+    Retry-After header. RATE_LIMIT_BACKEND 'memory' keeps buckets per
+    worker, 'sqlite' shares them between the workers on the host and 'off'
+    disables limiting.
+    """
+    backend = app.config['RATE_LIMIT_BACKEND']
+    if backend == 'off':
+        return
+    if backend == 'sqlite':
+        path = app.config['RATE_LIMIT_PATH'] or os.path.join(app.instance_path, 'ratelimit.db')
+        rate_limiter.backend = SqliteStore(path, table='rate_limits')
+    elif backend == 'memory':
+        rate_limiter.backend = MemoryStore(max_entries=app.config['RATE_LIMIT_MAX_BUCKETS'])
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND {backend!r}")
+    rate_limiter.sweep_interval = app.config['SESSION_SWEEP_INTERVAL']
+    limits = {endpoint: {scope: parse_limit(limit) for scope, limit in scopes.items()}
+              for endpoint, scopes in app.config['RATE_LIMITS'].items()}
+
+    @app.before_request
+    def check_rate_limits():
+        scopes = limits.get(request.endpoint)
+        if not scopes or request.method != 'POST':
+            return None
+        for scope, (capacity, seconds) in scopes.items():
+            identity = request.remote_addr if scope == 'ip' else request_account()
+            if identity is None:
+                continue
+            wait = rate_limiter.take(f'{request.endpoint}:{scope}:{identity}', capacity, seconds)
+            if wait:
+                rate_limiter.reject(request.endpoint, scope)
+                return "Too many requests, please try again shortly.", 429, {'Retry-After': str(int(wait) + 1)}
+        return None
@@ -0,0 +1,132 @@
+import json
+import re
+from datetime import date as date_type, timedelta
+from functools import lru_cache
+from .models import db, ScheduleTemplate
+
+# Availability bitmaps are stored as signed 64-bit integers
+MAX_SLOTS_PER_DAY = 63
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+DEFAULT_SCHEDULE = 'Standard'
+DEFAULT_HOURS = {str(day): [['10:00', '13:00'], ['14:00', '23:00']] for day in range(7)}
+
+ISO_DATE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+
+def parse_slot_date(value):
+    """The date named by a YYYY-MM-DD string; raises ValueError for anything else.
+
+    Appointments and availability rows key on the date string, so spellings
+    such as '2030-1-7' or '20300107' are refused rather than stored as a
+    second copy of the same day.
+    """
+    if not isinstance(value, str) or not ISO_DATE.fullmatch(value):
+        raise ValueError(f"{value!r} is not a YYYY-MM-DD date.")
+    return date_type.fromisoformat(value)
+
+
+def _minutes(clock):
+    hours, minutes = clock.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def _label(minute):
+    # On-the-hour slots keep the short 'HH' labels of existing bookings, so a
+    # doctor moved to a finer template still sees those bookings; labels
+    # still sort in time order ('09' < '09:30' < '10')
+    hours, minutes = divmod(minute, 60)
+    return f'{hours:02d}' if minutes == 0 else f'{hours:02d}:{minutes:02d}'
+
+
+@lru_cache(maxsize=256)
+def _week_slots(slot_minutes, hours_key):
+    weekly_hours = json.loads(hours_key)
+    week = []
+    for weekday in range(7):
+        labels = []
+        for start, end in weekly_hours.get(str(weekday), []):
+            minute, stop = _minutes(start), _minutes(end)
+            while minute + slot_minutes <= stop:
+                labels.append(_label(minute))
+                minute += slot_minutes
+        week.append(tuple(labels))
+    return tuple(week)
+
+
+def week_slots(template):
+    """Slot labels for each weekday, Monday first. Expanded once per
+    distinct template and shared by every doctor using it."""
+    return _week_slots(template.slot_minutes, json.dumps(template.weekly_hours, sort_keys=True))
+
+
+def expand(template, start, end):
+    """{date: slot labels} for every day from start to end inclusive."""
+    week = week_slots(template)
+    holidays = set(template.holidays or [])
+    days = {}
+    day = start
+    while day <= end:
+        key = day.isoformat()
+        days[key] = () if key in holidays else week[day.weekday()]
+        day += timedelta(days=1)
+    return days
+
+
+def slots_on(all_time, template, date):
+    """Slot labels offered on a YYYY-MM-DD date by a doctor with this
+    legacy all_time list and schedule template."""
+    if template is None:
+        return list(all_time or [])
+    if date in (template.holidays or []):
+        return ()
+    return week_slots(template)[parse_slot_date(date).weekday()]
+
+
+def doctor_slots(doctor, date):
+    return slots_on(doctor.all_time, doctor.schedule, date)
+
+
+def slot_label(time):
+    """'10' -> '10:00'; 'HH:MM' labels are returned unchanged."""
+    return time if ':' in time else f'{time}:00'
+
+
+def slot_start(time):
+    """Minutes after midnight a slot label starts at: '10' -> 600, '14:30' -> 870."""
+    return _minutes(slot_label(time))
+
+
+def parse_hours(spec):
+    """Parse 'mon-fri=09:00-13:00,14:00-18:00;sat=10:00-14:00' into weekly_hours."""
+    weekly_hours = {}
+    for part in filter(None, (part.strip() for part in spec.split(';'))):
+        days, _, ranges = part.partition('=')
+        first, _, last = days.strip().lower().partition('-')
+        first_index = WEEKDAYS.index(first)
+        last_index = WEEKDAYS.index(last) if last else first_index
+        intervals = [clock_range.strip().split('-') for clock_range in ranges.split(',')]
+        for weekday in range(first_index, last_index + 1):
+            weekly_hours[str(weekday)] = intervals
+    return weekly_hours
+
+
+def validate(template):
+    if not 5 <= template.slot_minutes <= 24 * 60:
+        raise ValueError("Slot length must be between 5 minutes and a day.")
+    for weekday, labels in enumerate(week_slots(template)):
+        if len(labels) > MAX_SLOTS_PER_DAY:
+            raise ValueError(f"{WEEKDAYS[weekday]} has {len(labels)} slots; at most {MAX_SLOTS_PER_DAY} are allowed.")
+    for day in template.holidays or []:
+        parse_slot_date(day)
+
+
+def default_schedule():
+    return ScheduleTemplate.query.filter_by(name=DEFAULT_SCHEDULE).first()
+
+
+def seed_default_schedule():
+    if default_schedule() is None:
+        db.session.add(ScheduleTemplate(name=DEFAULT_SCHEDULE, slot_minutes=60,
+                                        weekly_hours=DEFAULT_HOURS, holidays=[]))
+        db.session.commit()
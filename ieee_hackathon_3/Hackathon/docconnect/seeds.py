@@ -0,0 +1,25 @@
+from .models import db, Clinic
+from .schedules import seed_default_schedule
+
+DEFAULT_CLINICS = [
+    ("Ruby Hall Clinic", " Wanowrie"),
+    ("Medipoint Hospital", "Aundh"),
+    ("Deenanath Mangeshkar Hospital", "Erandwane"),
+    ("Lifeline Hospital", "Baner"),
+]
+
+
+def seed_clinics():
+    """Add the default clinics to an empty clinic table. Returns how many were added."""
+    if Clinic.query.count():
+        return 0
+    db.session.add_all(Clinic(name=name, location=location) for name, location in DEFAULT_CLINICS)
+    db.session.commit()
+    return len(DEFAULT_CLINICS)
+
+
+def seed():
+    """Add the default clinics and schedule template where missing."""
+    added = seed_clinics()
+    seed_default_schedule()
+    return added
@@ -0,0 +1,177 @@
+import os
+import secrets
+import time
+from flask import session as current_session
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from itsdangerous import Signer, BadSignature
+from werkzeug.datastructures import CallbackDict
+from .storage import MemoryStore, SqliteStore
+
+
+def load_secret_key(path):
+    """Return the secret key stored at path, creating it on first use.
+
+    The key is written to a temporary file and hard-linked into place, so
+    workers starting at the same time all end up reading the same key.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(secrets.token_bytes(32))
+        os.chmod(tmp, 0o600)
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.replaced_sid = None
+
+    def regenerate(self):
+        """Move the data to a fresh session id; the old id is deleted when
+        the session is saved, so a cookie issued before stops working."""
+        if self.replaced_sid is None and not self.new:
+            self.replaced_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data on the server; the cookie carries only a signed
+    session id and the version of the data last written.
+
+    A worker serves a session from its in-memory hot cache only when the
+    cached version matches both the cookie and the version in the shared
+    store, so a session logged out or regenerated on another worker stops
+    working everywhere at once. The check reads only the version, which
+    spares decoding the stored data on every request.
+    """
+
+    def __init__(self, store, hot_cache=None, sweep_interval=300):
+        self.store = store
+        self.hot_cache = hot_cache
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid, version = self._signer(app).unsign(cookie).decode().rsplit('.', 1)
+            except (BadSignature, ValueError):
+                sid = version = None
+            data = self._load(sid, version) if sid else None
+            if data is not None:
+                return ServerSession(session_json_serializer.loads(data), sid=sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def _load(self, sid, version):
+        if self.hot_cache is not None:
+            cached = self.hot_cache.get(sid)
+            if (cached is not None and cached[0] == version
+                    and self.store.get_field(sid, 'version') == version):
+                return cached[1]
+        stored = self.store.get(sid)
+        if stored is None:
+            return None
+        if self.hot_cache is not None:
+            self.hot_cache.set(sid, (stored['version'], stored['data']))
+        return stored['data']
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if session.replaced_sid:
+            self._delete(session.replaced_sid)
+
+        if not session:
+            if session.modified and not session.new:
+                self._delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified:
+            return
+
+        version = secrets.token_hex(4)
+        data = session_json_serializer.dumps(dict(session))
+        ttl = int(app.permanent_session_lifetime.total_seconds())
+        self.store.set(session.sid, {'version': version, 'data': data}, ttl=ttl)
+        if self.hot_cache is not None:
+            self.hot_cache.set(session.sid, (version, data), ttl=ttl)
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(f'{session.sid}.{version}').decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            domain=domain,
+            path=path,
+        )
+        self._sweep()
+
+    def _delete(self, sid):
+        self.store.delete(sid)
+        if self.hot_cache is not None:
+            self.hot_cache.delete(sid)
+
+    def _sweep(self):
+        now = time.time()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        self.store.sweep()
+        if self.hot_cache is not None:
+            self.hot_cache.sweep()
+
+
+def regenerate_session():
+    """Give the current session a new id, e.g. when its user logs in, so an
+    id planted before login cannot be used afterwards. Cookie sessions
+    carry their data in the cookie and are left as they are."""
+    if isinstance(current_session._get_current_object(), ServerSession):
+        current_session.regenerate()
+
+
+def init_sessions(app):
+    """Install the session backend named by SESSION_BACKEND.
+
+    'cookie' keeps Flask's signed-cookie sessions, 'memory' suits a single
+    process, and 'sqlite' shares sessions between all workers on the host.
+    """
+    backend = app.config['SESSION_BACKEND']
+    ttl = int(app.permanent_session_lifetime.total_seconds())
+    if backend == 'cookie':
+        return
+    if backend == 'memory':
+        store, hot_cache = MemoryStore(default_ttl=ttl), None
+    elif backend == 'sqlite':
+        path = app.config['SESSION_DB_PATH'] or os.path.join(app.instance_path, 'sessions.db')
+        store = SqliteStore(path, default_ttl=ttl, table='sessions')
+        hot_cache = MemoryStore(max_entries=app.config['SESSION_HOT_CACHE_SIZE'], default_ttl=ttl)
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND {backend!r}")
+    app.session_interface = ServerSideSessionInterface(
+        store, hot_cache, sweep_interval=app.config['SESSION_SWEEP_INTERVAL'])
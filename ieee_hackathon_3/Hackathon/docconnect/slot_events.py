@@ -0,0 +1,83 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class SlotWatchers:
+    """Wakes slot streams in this process when a (doctor_id, date) bitmap
+    changes in a committed transaction.
+
+    Only keys with an open stream are tracked. Streams also re-read the
+    bitmap every poll interval, which is how they see bookings committed
+    by other worker processes.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._watchers = Counter()
+        self._versions = {}
+        self._streams = 0
+
+    def open_stream(self, limit):
+        """Claim one of limit stream places in this process; False when all
+        are taken. Each successful call needs a close_stream()."""
+        with self._condition:
+            if self._streams >= limit:
+                return False
+            self._streams += 1
+            return True
+
+    def close_stream(self):
+        with self._condition:
+            self._streams -= 1
+
+    @contextmanager
+    def watching(self, key):
+        with self._condition:
+            self._watchers[key] += 1
+            self._versions.setdefault(key, 0)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._watchers[key] -= 1
+                if not self._watchers[key]:
+                    del self._watchers[key]
+                    del self._versions[key]
+
+    def notify(self, keys):
+        with self._condition:
+            watched = [key for key in keys if key in self._versions]
+            for key in watched:
+                self._versions[key] += 1
+            if watched:
+                self._condition.notify_all()
+
+    def wait(self, key, seen, timeout):
+        """Block until key changes past seen or timeout passes; returns the
+        key's current change count."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._versions.get(key, 0) != seen, timeout)
+            return self._versions.get(key, 0)
+
+
+slot_watchers = SlotWatchers()
+
+
+def slots_changed(session, keys):
+    """Record (doctor_id, date) bitmaps changed in session's transaction."""
+    session.info.setdefault('slots_changed', set()).update(keys)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_slot_watchers(session):
+    keys = session.info.pop('slots_changed', None)
+    if keys:
+        slot_watchers.notify(keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_slot_changes(session):
+    session.info.pop('slots_changed', None)
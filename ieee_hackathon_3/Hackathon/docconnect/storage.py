@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryStore:
+    """Thread-safe in-process key/value store with per-entry TTL and LRU
+    eviction once max_entries is reached."""
+
+    def __init__(self, max_entries=10000, default_ttl=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def get_field(self, key, field, default=None):
+        """value[field] of a dict value, without fetching the whole value
+        from stores where that costs something."""
+        value = self.get(key)
+        return default if value is None else value.get(field, default)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires) in self._data.items()
+                       if expires is not None and expires <= now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SqliteStore:
+    """Key/value store in a local SQLite file, shared by every worker process
+    on the host. Values must be JSON serializable."""
+
+    def __init__(self, path, default_ttl=None, table='kv'):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.table = table
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute(
+            f'CREATE TABLE IF NOT EXISTS {table} '
+            '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)'
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            f'SELECT value, expires FROM {self.table} WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return default
+        return json.loads(row[0])
+
+    def get_field(self, key, field, default=None):
+        row = self._conn().execute(
+            f"SELECT json_extract(value, '$.' || ?), expires FROM {self.table} WHERE key = ?", (field, key)
+        ).fetchone()
+        if row is None or row[0] is None or (row[1] is not None and row[1] <= time.time()):
+            return default
+        return row[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else None
+        self._conn().execute(
+            f'INSERT OR REPLACE INTO {self.table} (key, value, expires) VALUES (?, ?, ?)',
+            (key, json.dumps(value), expires),
+        )
+
+    def delete(self, key):
+        self._conn().execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def clear(self):
+        self._conn().execute(f'DELETE FROM {self.table}')
+
+    def sweep(self):
+        cursor = self._conn().execute(
+            f'DELETE FROM {self.table} WHERE expires IS NOT NULL AND expires <= ?', (time.time(),)
+        )
+        return cursor.rowcount
@@ -0,0 +1,2 @@
+def emailcorrecting(email):
+    return email.strip().lower()
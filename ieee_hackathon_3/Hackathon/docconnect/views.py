@@ -0,0 +1,503 @@
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from werkzeug.http import http_date
+from .models import db, User, Doctor, Clinic, SpecialityEnum, Account
+from .booking import reserve_slot, appointments_query, appointments_page, patient_appointments_page
+from .availability import day_slots, booked_mask, next_free_slots
+from .bulk_import import read_rows, import_bookings
+from .schedules import default_schedule, doctor_slots, slot_label, parse_slot_date
+from .slot_events import slot_watchers
+from .hashing import hasher, HashingBusy
+from .instrumentation import render_metrics
+from .ratelimit import rate_limiter
+from .sessions import regenerate_session
+from .cache import cached_clinics, cached_doctors, cached_page, directory_cache, template_cache
+from .storage import MemoryStore
+from .utils import emailcorrecting
+import hmac
+import io
+import json
+from datetime import date, timedelta, timezone
+from time import monotonic
+
+def parse_day(value):
+    # FullCalendar sends full ISO datetimes; only the date part matters here
+    return parse_slot_date(value[:10]) if value else None
+
+MAX_SEARCH_DAYS = 31
+MAX_SEARCH_RESULTS = 100
+MAX_EVENT_DAYS = 62
+APPOINTMENTS_PER_PAGE = 50
+
+main = Blueprint('main', __name__)
+
+# Resized from EVENT_FEED_CACHE_SIZE by create_app
+event_feed_cache = MemoryStore()
+
+SPECIALTIES_FOR_TEMPLATE = [(member.name, member.value) for member in SpecialityEnum]
+
+def upgrade_password_hash(account, password):
+    # Re-hash with the current cost factor after BCRYPT_ROUNDS is raised
+    if hasher.needs_rehash(account.password):
+        account.password = hasher.hash_password(password)
+        profile = account.doctor if account.role == 'doctor' else account.user
+        if profile is not None:
+            profile.password = account.password
+        db.session.commit()
+
+@main.app_errorhandler(HashingBusy)
+def hashing_busy(error):
+    return "Server is busy, please try again shortly.", 503, {'Retry-After': '1'}
+
+@main.route('/')
+def home():
+    return cached_page('home', 'home.html')
+
+@main.route('/register', methods=['GET', 'POST'])
+def register():
+    clinics = cached_clinics()
+
+    if request.method == 'POST':
+        email = emailcorrecting(request.form['username'])
+        password = request.form['password'].encode('utf-8')
+        role = request.form.get('role')
+        clinic_id = request.form.get('clinic_id')
+        doc_code = request.form.get('doc_code', '').strip()
+
+        if Account.query.filter_by(email=email).first():
+            flash("Email already registered under another role.")
+            return redirect('/register')
+
+        if role == 'patient' and doc_code:
+            flash("Patients should not enter a doctor code.")
+            return redirect('/register')
+
+        if role == 'doctor' and doc_code != 'doc123':
+            flash("Invalid doctor code.")
+            return redirect('/register')
+
+        hashed = hasher.hash_password(password)
+
+        if role == 'doctor':
+            speciality_name = request.form.get('speciality', '').strip()
+            if not speciality_name:
+                flash("Please select a speciality.")
+                return render_template('register.html', clinics=clinics, specialties=SPECIALTIES_FOR_TEMPLATE)
+
+            try:
+                speciality_enum = SpecialityEnum[speciality_name]
+            except KeyError:
+                flash("Invalid speciality selected.")
+                return render_template('register.html', clinics=clinics, specialties=SPECIALTIES_FOR_TEMPLATE)
+
+            clinic = Clinic.query.get(int(clinic_id)) if clinic_id else None
+            new_user = Doctor(
+                email=email,
+                password=hashed,
+                speciality=speciality_enum,
+                clinic=clinic,
+                schedule=default_schedule(),
+                booked_time=[]
+            )
+            account = Account(email=email, role='doctor', password=hashed, doctor=new_user)
+        else:
+            new_user = User(email=email, password=hashed)
+            account = Account(email=email, role='patient', password=hashed, user=new_user)
+
+        db.session.add(account)
+        db.session.commit()
+        flash("Registered successfully!")
+
+        if role == 'doctor':
+            return redirect('/login')
+        else:
+            regenerate_session()
+            session['user_id'] = new_user.id
+            return redirect('/select_clinic')
+
+    return cached_page('register', 'register.html', clinics=clinics, specialties=SPECIALTIES_FOR_TEMPLATE)
+
+@main.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = emailcorrecting(request.form['username'])
+        password = request.form['password'].encode('utf-8')
+
+        account = Account.query.filter_by(email=email).first()
+
+        if account and hasher.check_password(password, account.password):
+            upgrade_password_hash(account, password)
+            regenerate_session()
+            session['user_id'] = account.profile_id
+            session['role'] = account.role
+
+            if account.role == 'doctor':
+                flash("Login successful as Doctor!")
+                return redirect('/doc_dashboard')
+            flash("Login successful as Patient!")
+            return redirect('/select_clinic')
+
+        else:
+            flash("Invalid credentials.")
+            return redirect('/login')
+
+    return render_template('login.html')
+
+@main.route('/dashboard', methods=['GET', 'POST'])
+def dashboard():
+    if 'user_id' not in session or session.get('role') != 'patient':
+        flash("Unauthorized access.")
+        return redirect('/login')
+
+    clinic_id = request.args.get('clinic_id')
+    speciality_name = request.args.get('speciality', '').strip()
+    doc_id = request.args.get('doc_id')
+    selected_date = request.args.get('selected_date')
+
+    speciality_enum = None
+    if speciality_name:
+        try:
+            speciality_enum = SpecialityEnum[speciality_name]
+        except KeyError:
+            flash("Invalid speciality filter.")
+
+    docs = cached_doctors(request.args.get('clinic_id', type=int), speciality_enum)
+    selected_doctor = (db.session.get(Doctor, int(doc_id), options=[joinedload(Doctor.clinic)])
+                       if doc_id else None)
+
+    if request.method == 'POST':
+        form = request.form
+
+        # ✅ Booking attempt
+        if 'time' in form and 'selected_doc_id' in form and 'selected_date' in form:
+            time = form.get('time')
+            date = form.get('selected_date')
+            doc_id = form.get('selected_doc_id')
+            patient = User.query.get(session['user_id'])
+
+            if not doc_id or not time or not date:
+                flash("Incomplete booking details.")
+                return redirect(url_for('main.dashboard', clinic_id=clinic_id, speciality=speciality_name))
+
+            doctor = Doctor.query.get(int(doc_id))
+            if not doctor:
+                flash("Doctor not found.")
+                return redirect(url_for('main.dashboard', clinic_id=clinic_id, speciality=speciality_name))
+
+            result = reserve_slot(doctor, patient, date, time)
+            flash(result.value)
+            return redirect(url_for('main.dashboard', clinic_id=clinic_id, speciality=speciality_name, doc_id=doc_id, selected_date=date))
+
+        # ✅ Doctor selection form
+        elif 'doc_id' in form:
+            doc_id = form.get('doc_id')
+            return redirect(url_for('main.dashboard', clinic_id=clinic_id, speciality=speciality_name, doc_id=doc_id))
+
+        # ✅ Date selection change
+        elif 'selected_date' in form and 'selected_doc_id' in form:
+            date = form.get('selected_date')
+            doc_id = form.get('selected_doc_id')
+            return redirect(url_for('main.dashboard', clinic_id=clinic_id, speciality=speciality_name, doc_id=doc_id, selected_date=date))
+
+        # ❌ Fallback
+        flash("Invalid form submission.")
+        return redirect(url_for('main.dashboard', clinic_id=clinic_id, speciality=speciality_name))
+
+    # ✅ Slot states for the selected date, read from the availability bitmap
+    try:
+        selected_date = parse_slot_date(selected_date).isoformat() if selected_date else None
+    except ValueError:
+        flash("Dates must be YYYY-MM-DD.")
+        selected_date = None
+    slots = day_slots(selected_doctor, selected_date) if selected_doctor and selected_date else []
+
+    return render_template('dashboard.html',
+                           docs=docs,
+                           selected_doctor=selected_doctor,
+                           selected_date=selected_date,
+                           slots=slots)
+
+
+
+@main.route('/select_clinic')
+def select_clinic():
+    if 'user_id' not in session or session.get('role') != 'patient':
+        flash("Unauthorized access.")
+        return redirect('/login')
+
+    clinics = cached_clinics()
+    return render_template('clinic_selection.html', clinics=clinics, specialties=SPECIALTIES_FOR_TEMPLATE)
+
+@main.route('/doc_dashboard')
+def doc_dashboard():
+    if 'user_id' not in session or session.get('role') != 'doctor':
+        flash("Unauthorized access.")
+        return redirect('/login')
+
+    doctor = Doctor.query.get(session['user_id'])
+    # The calendar pulls the visible range from doctor_events
+    try:
+        initial_date = parse_day(request.args.get('date')) or date.today()
+    except ValueError:
+        initial_date = date.today()
+    return render_template('doc_dashboard.html', doctor=doctor, initial_date=initial_date.isoformat())
+
+
+@main.route('/api/doctor/events')
+def doctor_events():
+    if 'user_id' not in session or session.get('role') != 'doctor':
+        return jsonify(error="Unauthorized access."), 401
+
+    try:
+        start = parse_day(request.args.get('start'))
+        end = parse_day(request.args.get('end'))
+    except ValueError:
+        return jsonify(error="start and end must be ISO dates."), 400
+    if not start or not end or end < start or (end - start).days > MAX_EVENT_DAYS:
+        return jsonify(error=f"start and end must span at most {MAX_EVENT_DAYS} days."), 400
+
+    doctor_id = session['user_id']
+    version, updated_at = db.session.execute(
+        select(Doctor.booking_version, Doctor.bookings_updated_at).where(Doctor.id == doctor_id)
+    ).one()
+    etag = f"{doctor_id}-{version}-{start}-{end}"
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+    if updated_at:
+        headers['Last-Modified'] = http_date(updated_at.replace(tzinfo=timezone.utc))
+
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+
+    cache_key = (doctor_id, start, end)
+    cached = event_feed_cache.get(cache_key)
+    if cached and cached[0] == version:
+        body = cached[1]
+    else:
+        query = appointments_query(doctor_id, start, end).execution_options(yield_per=500)
+        body = json.dumps([
+            {"title": f"{slot.patient_email} - {slot_label(slot.time)}",
+             "start": f"{slot.date}T{slot_label(slot.time)}"}
+            for slot in db.session.execute(query).scalars()
+        ])
+        event_feed_cache.set(cache_key, (version, body))
+
+    return Response(body, mimetype='application/json', headers=headers)
+
+
+@main.route('/clinic_select', methods=['POST'])
+def go_to_doctor_page():
+    clinic_id = request.form.get('clinic_id', '').strip()
+    speciality = request.form.get('speciality', '').strip()
+
+    if not clinic_id:
+        flash("Please choose a clinic.")
+        return redirect(url_for('main.select_clinic'))
+
+    if speciality:
+        try:
+            _ = SpecialityEnum[speciality]
+        except KeyError:
+            flash("Invalid speciality selected.")
+            return redirect(url_for('main.select_clinic'))
+
+    return redirect(url_for('main.dashboard', clinic_id=clinic_id, speciality=speciality))
+
+@main.route('/api/free_slots')
+def free_slots():
+    if 'user_id' not in session or session.get('role') != 'patient':
+        return jsonify(error="Unauthorized access."), 401
+
+    clinic_id = request.args.get('clinic_id', type=int)
+    speciality_name = request.args.get('speciality', '').strip()
+    limit = min(request.args.get('limit', 10, type=int), MAX_SEARCH_RESULTS)
+    if not clinic_id:
+        return jsonify(error="clinic_id is required."), 400
+    if limit < 1:
+        return jsonify(error=f"limit must be 1 to {MAX_SEARCH_RESULTS}."), 400
+
+    speciality_enum = None
+    if speciality_name:
+        try:
+            speciality_enum = SpecialityEnum[speciality_name]
+        except KeyError:
+            return jsonify(error="Invalid speciality."), 400
+
+    try:
+        start = parse_slot_date(request.args['start']) if request.args.get('start') else date.today()
+        end = parse_slot_date(request.args['end']) if request.args.get('end') else start + timedelta(days=7)
+    except ValueError:
+        return jsonify(error="Dates must be YYYY-MM-DD."), 400
+    if end < start or (end - start).days >= MAX_SEARCH_DAYS:
+        return jsonify(error=f"Date range must cover 1 to {MAX_SEARCH_DAYS} days."), 400
+
+    slots = next_free_slots(clinic_id, speciality_enum, start, end, limit)
+    return jsonify(slots=slots)
+
+def slot_state(doctor_id, date, slots, mask):
+    return {'doctor_id': doctor_id, 'date': date,
+            'slots': [{'time': time, 'label': slot_label(time), 'booked': bool(mask >> i & 1)}
+                      for i, time in enumerate(slots)]}
+
+def slot_request(doctor_id):
+    """(doctor, date) for the slot endpoints, or an error response."""
+    if 'user_id' not in session or session.get('role') != 'patient':
+        return None, (jsonify(error="Unauthorized access."), 401)
+    try:
+        day = parse_slot_date(request.args.get('date', '')).isoformat()
+    except ValueError:
+        return None, (jsonify(error="date must be YYYY-MM-DD."), 400)
+    doctor = db.session.get(Doctor, doctor_id)
+    if doctor is None:
+        return None, (jsonify(error="Doctor not found."), 404)
+    return (doctor, day), None
+
+@main.route('/api/doctors/<int:doctor_id>/slots')
+def doctor_slot_state(doctor_id):
+    found, error = slot_request(doctor_id)
+    if error:
+        return error
+    doctor, day = found
+    return jsonify(slot_state(doctor_id, day, doctor_slots(doctor, day), booked_mask(doctor_id, day)))
+
+@main.route('/api/doctors/<int:doctor_id>/slots/stream')
+def doctor_slot_stream(doctor_id):
+    """Server-sent 'slots' events with the day's slot state, sent on
+    connect and whenever a booking changes it."""
+    found, error = slot_request(doctor_id)
+    if error:
+        return error
+    doctor, day = found
+    # Every open stream occupies a worker thread; past the limit the
+    # dashboard falls back to polling doctor_slot_state
+    if not slot_watchers.open_stream(current_app.config['SLOT_STREAM_MAX_STREAMS']):
+        return jsonify(error="Live updates are busy; poll the slots endpoint."), 503, {'Retry-After': '30'}
+    slots = list(doctor_slots(doctor, day))
+    poll = current_app.config['SLOT_STREAM_POLL_SECONDS']
+    lifetime = current_app.config['SLOT_STREAM_MAX_SECONDS']
+    key = (doctor_id, day)
+    db.session.close()
+
+    def generate():
+        # The browser reconnects after the stream ends, so no worker is held for long
+        yield f'retry: {int(poll * 1000)}\n\n'
+        with slot_watchers.watching(key):
+            deadline = monotonic() + lifetime
+            sent, seen, idle = None, 0, 0
+            while monotonic() < deadline:
+                mask = booked_mask(doctor_id, day)
+                db.session.close()
+                if mask != sent:
+                    sent, idle = mask, 0
+                    yield f'event: slots\ndata: {json.dumps(slot_state(doctor_id, day, slots, mask))}\n\n'
+                elif idle >= 15:
+                    idle = 0
+                    yield ': keep-alive\n\n'
+                started = monotonic()
+                seen = slot_watchers.wait(key, seen, max(0, min(poll, deadline - started)))
+                idle += monotonic() - started
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(slot_watchers.close_stream)
+    return response
+
+@main.route('/api/bookings/bulk', methods=['POST'])
+def bulk_bookings():
+    token = current_app.config['BULK_IMPORT_TOKEN']
+    given = request.headers.get('X-Import-Token', '')
+    if not token or not hmac.compare_digest(given, token):
+        return jsonify(error="Invalid import token."), 403
+
+    fmt = 'csv' if request.mimetype == 'text/csv' else 'jsonl'
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    results = import_bookings(read_rows(stream, fmt), current_app.config['BULK_IMPORT_BATCH_SIZE'])
+
+    # One JSON result per input row, sent as each batch commits
+    def generate():
+        for result in results:
+            yield json.dumps(result) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@main.route('/metrics/cache')
+def cache_metrics():
+    return jsonify(directory=directory_cache.stats(), templates=template_cache.stats())
+
+@main.route('/metrics')
+def metrics():
+    extra = []
+    for name, cache in (('directory', directory_cache), ('template', template_cache)):
+        stats = cache.stats()
+        extra += [f'# TYPE {name}_cache_hits_total counter', f"{name}_cache_hits_total {stats['hits']}",
+                  f'# TYPE {name}_cache_misses_total counter', f"{name}_cache_misses_total {stats['misses']}"]
+    extra += rate_limiter.metrics()
+    return Response(render_metrics(extra), mimetype='text/plain; version=0.0.4')
+
+@main.route('/logout')
+def logout():
+    session.clear()
+    flash("Logged out successfully.")
+    return redirect('/login')
+
+@main.route('/appointments')
+
+def appointments():
+    if 'user_id' not in session or session.get('role') != 'doctor':
+        flash("Unauthorized access.")
+        return redirect('/login')
+
+    doctor = Doctor.query.get(session['user_id'])
+    try:
+        start = parse_day(request.args.get('start')) or date.today()
+        end = parse_day(request.args.get('end'))
+    except ValueError:
+        flash("Dates must be YYYY-MM-DD.")
+        return redirect(url_for('main.appointments'))
+
+    after = request.args.get('after')
+    try:
+        bookings, next_cursor = appointments_page(doctor.id, start, end, after, APPOINTMENTS_PER_PAGE)
+    except ValueError:
+        flash("Invalid page.")
+        return redirect(url_for('main.appointments'))
+
+    return render_template('appointments.html', bookings=bookings, doctor=doctor,
+                           start=start.isoformat(), end=end.isoformat() if end else '',
+                           next_cursor=next_cursor)
+
+def patient_appointments_request():
+    """(upcoming, page, next_cursor) for the patient's own appointment views;
+    raises ValueError for a malformed cursor."""
+    upcoming = request.args.get('when', 'upcoming') != 'past'
+    page, next_cursor = patient_appointments_page(session['user_id'], upcoming, request.args.get('after'),
+                                                  APPOINTMENTS_PER_PAGE)
+    return upcoming, page, next_cursor
+
+@main.route('/my_appointments')
+def my_appointments():
+    if 'user_id' not in session or session.get('role') != 'patient':
+        flash("Unauthorized access.")
+        return redirect('/login')
+
+    try:
+        upcoming, bookings, next_cursor = patient_appointments_request()
+    except ValueError:
+        flash("Invalid page.")
+        return redirect(url_for('main.my_appointments'))
+
+    return render_template('my_appointments.html', bookings=bookings,
+                           when='upcoming' if upcoming else 'past', next_cursor=next_cursor)
+
+@main.route('/api/my/appointments')
+def my_appointments_api():
+    if 'user_id' not in session or session.get('role') != 'patient':
+        return jsonify(error="Unauthorized access."), 401
+
+    try:
+        _, bookings, next_cursor = patient_appointments_request()
+    except ValueError:
+        return jsonify(error="Invalid cursor."), 400
+    for booking in bookings:
+        booking['label'] = slot_label(booking['time'])
+    return jsonify(appointments=bookings, next_cursor=next_cursor)